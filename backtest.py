@@ -0,0 +1,139 @@
+"""Backtest กฎซื้อ/ขายจาก RSI/EMA ของหลายหุ้นพร้อมกันด้วย array operations (ไม่มี loop ทีละแท่ง)
+
+กฎเดียวกับสรุปภาพรวมใน dashboard: ซื้อเมื่อ RSI < oversold และราคา > EMA, ขายเมื่อ RSI > overbought และราคา < EMA
+ถือสถานะ (long-only) จนกว่าจะมีสัญญาณขาย โดยเข้าหรือออกที่ราคาปิดของแท่งที่เกิดสัญญาณ (ผลตอบแทนเริ่มนับจากแท่งถัดไป)
+
+ตัวอย่าง:
+    python backtest.py --period 5y
+    python backtest.py --offline --tickers T1 T2 T3 --grid --processes 4
+"""
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import ALL_TICKERS
+from indicators import ema, rsi
+from market_data import LocalPriceSource, fetch_price_batch
+from signals import RSI_OVERBOUGHT, RSI_OVERSOLD, buy_sell_signals
+
+TRADING_DAYS = 252
+
+DEFAULT_GRID = {
+    "oversold": [20, 25, 30, 35, 40],
+    "overbought": [60, 65, 70, 75, 80],
+    "rsi_window": [14],
+    "ema_span": [10, 20, 50],
+}
+
+
+def backtest(close, oversold=RSI_OVERSOLD, overbought=RSI_OVERBOUGHT, rsi_window=14, ema_span=20,
+             rsi_method="sma", cost_bps=0):
+    """รัน backtest ของทุกคอลัมน์ใน close (วันที่ × ticker)
+
+    คืน dict: metrics (ticker × ตัวชี้วัดผลตอบแทน), equity (มูลค่าพอร์ตสะสม), position (สถานะที่ถือแต่ละวัน)
+    """
+    close = close.astype(float).ffill()
+    buy, sell = buy_sell_signals(close, rsi(close, window=rsi_window, method=rsi_method), ema(close, span=ema_span),
+                                 oversold=oversold, overbought=overbought)
+
+    # สัญญาณซื้อ → 1, ขาย → 0, อื่น ๆ คงสถานะเดิม (ffill)
+    # เลื่อนไป 1 แท่ง = ซื้อ/ขายที่ราคาปิดของแท่งสัญญาณ จึงได้ผลตอบแทนตั้งแต่ปิดแท่งนั้นถึงปิดแท่งถัดไป
+    signal = np.where(buy, 1.0, np.where(sell, 0.0, np.nan))
+    position = pd.DataFrame(signal, index=close.index, columns=close.columns).ffill().fillna(0.0)
+    held = position.shift(1).fillna(0.0)
+
+    returns = (close / close.shift(1) - 1).fillna(0.0)
+    turnover = held.diff().abs().fillna(held)
+    strategy = held * returns - turnover * cost_bps / 10_000
+    equity = (1 + strategy).cumprod()
+
+    drawdown = equity / equity.cummax() - 1
+    years = max(len(close) / TRADING_DAYS, 1 / TRADING_DAYS)
+
+    # ผลตอบแทนรายเทรด: ให้เลขเทรดกับทุกวันที่ถือ แล้วรวม log return ตาม (ticker, เทรด)
+    entries = held.diff().fillna(held) > 0
+    trade_id = entries.cumsum().where(held > 0, 0)
+    stacked = pd.DataFrame({"trade": trade_id.stack(), "log_return": np.log1p(strategy).stack()})
+    stacked = stacked[stacked["trade"] > 0]
+    ticker_level = stacked.index.get_level_values(1)
+    trade_returns = stacked.groupby([ticker_level, stacked["trade"]])["log_return"].sum()
+    hit_rate = (trade_returns > 0).groupby(level=0).mean()
+
+    first_price = close.bfill().iloc[0]
+    metrics = pd.DataFrame({
+        "total_return": equity.iloc[-1] - 1,
+        "annual_return": equity.iloc[-1] ** (1 / years) - 1,
+        "max_drawdown": drawdown.min(),
+        "hit_rate": hit_rate.reindex(close.columns),
+        "trades": entries.sum(),
+        "exposure": held.mean(),
+        "buy_and_hold": close.iloc[-1] / first_price - 1,
+    })
+    return {"metrics": metrics, "equity": equity, "position": held}
+
+
+def summarize(metrics):
+    """สรุปผลของทุกหุ้นเป็นแถวเดียว (ค่าเฉลี่ยข้ามหุ้น)"""
+    return {
+        "mean_return": metrics["total_return"].mean(),
+        "median_return": metrics["total_return"].median(),
+        "mean_max_drawdown": metrics["max_drawdown"].mean(),
+        "mean_hit_rate": metrics["hit_rate"].mean(),
+        "total_trades": int(metrics["trades"].sum()),
+    }
+
+
+# ราคาที่ส่งให้แต่ละ worker ครั้งเดียวตอนเริ่ม process แทนการ pickle ซ้ำทุกชุดพารามิเตอร์
+_worker_close = None
+
+
+def _init_worker(close):
+    global _worker_close
+    _worker_close = close
+
+
+def _run_params(params):
+    return dict(params, **summarize(backtest(_worker_close, **params)["metrics"]))
+
+
+def run_grid(close, grid=None, processes=None, cost_bps=0):
+    """รัน backtest ทุกชุดพารามิเตอร์ใน grid กระจายไปหลาย core ด้วย process pool
+
+    คืน DataFrame หนึ่งแถวต่อชุดพารามิเตอร์ เรียงตามผลตอบแทนเฉลี่ยจากมากไปน้อย
+    """
+    grid = grid or DEFAULT_GRID
+    keys = list(grid)
+    combos = [dict(zip(keys, values), cost_bps=cost_bps) for values in itertools.product(*grid.values())]
+    # ข้ามชุดที่ oversold >= overbought เพราะสัญญาณซื้อและขายจะทับกัน
+    combos = [c for c in combos if c.get("oversold", RSI_OVERSOLD) < c.get("overbought", RSI_OVERBOUGHT)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(close,)) as executor:
+        rows = list(executor.map(_run_params, combos, chunksize=max(1, len(combos) // 32)))
+    return pd.DataFrame(rows).sort_values("mean_return", ascending=False, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest กฎซื้อ/ขายจาก RSI/EMA")
+    parser.add_argument("--tickers", nargs="+", default=sorted(ALL_TICKERS))
+    parser.add_argument("--period", default="5y")
+    parser.add_argument("--offline", action="store_true", help="ใช้ข้อมูลจำลอง (LocalPriceSource) แทน Yahoo Finance")
+    parser.add_argument("--oversold", type=float, default=RSI_OVERSOLD)
+    parser.add_argument("--overbought", type=float, default=RSI_OVERBOUGHT)
+    parser.add_argument("--cost-bps", type=float, default=0, help="ต้นทุนต่อการซื้อ/ขายหนึ่งครั้ง (basis points)")
+    parser.add_argument("--grid", action="store_true", help="sweep พารามิเตอร์ตาม DEFAULT_GRID")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    source = LocalPriceSource() if args.offline else None
+    close = fetch_price_batch(args.tickers, period=args.period, source=source).close_matrix()
+    if args.grid:
+        print(run_grid(close, processes=args.processes, cost_bps=args.cost_bps).to_string())
+    else:
+        result = backtest(close, oversold=args.oversold, overbought=args.overbought, cost_bps=args.cost_bps)
+        print(result["metrics"].round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
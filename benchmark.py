@@ -0,0 +1,443 @@
+"""Benchmark แบบออฟไลน์ของเส้นทางหลักของ dashboard จากข้อมูลที่บันทึกไว้ (ไม่ต้องมี API key หรือเน็ต)
+
+เล่นซ้ำ fixtures ใน fixtures/ (OHLCV, ผลตอบกลับ NewsAPI, คำตอบ LLM พร้อม latency ที่วัดได้ตอนบันทึก)
+fixtures ที่มากับ repo เป็นตัวอย่างที่เขียนขึ้นเอง และยังไม่มี OHLCV (ราคาใช้ random walk ของ LocalPriceSource)
+ตอนเริ่มจะพิมพ์แหล่งข้อมูลที่ใช้จริง ใช้ --record เพื่อแทนด้วยข้อมูลจาก API จริง
+ผ่าน get_stock_price_and_indicators, get_news_for_ticker และ analyze_sentiment_and_summarize
+แล้วรายงาน throughput, latency p50/p99 และหน่วยความจำสูงสุดของแต่ละขั้นตอน
+รวมถึงเวลา import ตอน cold start และเวลารัน main.py ครั้งแรก/ตอน rerun
+
+ตัวอย่าง:
+    python benchmark.py                                   # 10/100/1000 หุ้น
+    python benchmark.py --sizes 100 --output bench.json
+    python benchmark.py --sizes --app-reruns 20           # เฉพาะเวลา import และ rerun ของหน้า dashboard
+    python benchmark.py --baseline bench.json             # exit 1 ถ้าช้าลง/ใช้หน่วยความจำมากขึ้นเกิน tolerance
+    python benchmark.py --record --tickers NVDA MSFT PFE  # บันทึก fixtures ใหม่จาก API จริง (ต้องมี key)
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+try:
+    import resource
+except ImportError:  # Windows ไม่มี resource
+    resource = None
+
+# ใช้โฟลเดอร์ข้อมูลชั่วคราว ไม่ให้ปนกับแคช/คลังราคาจริง (ต้องตั้งก่อน import config)
+_TEMP_DATA_DIR = None
+if "INVEST_DATA_DIR" not in os.environ:
+    _TEMP_DATA_DIR = os.environ["INVEST_DATA_DIR"] = tempfile.mkdtemp(prefix="invest-bench-")
+
+import numpy as np
+import pandas as pd
+
+import core
+import telemetry
+from config import ALL_TICKERS, DATA_DIR
+from llm import FakeLLM
+from market_data import LocalPriceSource, YahooPriceSource
+from price_store import PriceStore
+from rate_limiter import SharedRateLimiter
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(ROOT_DIR, "fixtures")
+NEWS_FIXTURE = "newsapi_top_headlines.json"
+LLM_FIXTURE = "llm_responses.json"
+OHLCV_DIR = "ohlcv"
+
+DEFAULT_SIZES = [10, 100, 1000]
+DEFAULT_PRICE_LATENCY = 0.8  # วินาทีต่อ yf.download (ค่าประมาณ ไม่ได้วัด) เมื่อ fixtures ไม่มี OHLCV ที่บันทึกไว้
+
+
+def _silent(level, message):
+    pass
+
+
+# ========== Fixtures ==========
+def load_fixtures(path=FIXTURES_DIR):
+    """อ่าน fixtures ทั้งหมด: {"news": {query: {...}}, "llm": [...], "ohlcv": {ticker: DataFrame}, "price_latency": float,
+    "sources": {"prices"/"news"/"llm": คำอธิบายว่าเป็นข้อมูลที่บันทึกจริงหรือข้อมูลสังเคราะห์}}"""
+    with open(os.path.join(path, NEWS_FIXTURE)) as f:
+        news_data = json.load(f)
+    with open(os.path.join(path, LLM_FIXTURE)) as f:
+        llm_data = json.load(f)
+    news, llm = news_data["payloads"], llm_data["responses"]
+    ohlcv = {}
+    price_latency = DEFAULT_PRICE_LATENCY
+    ohlcv_dir = os.path.join(path, OHLCV_DIR)
+    if os.path.isdir(ohlcv_dir):
+        for name in sorted(os.listdir(ohlcv_dir)):
+            if name.endswith(".parquet"):
+                ohlcv[name[:-len(".parquet")]] = pd.read_parquet(os.path.join(ohlcv_dir, name))
+        try:
+            with open(os.path.join(ohlcv_dir, "manifest.json")) as f:
+                price_latency = json.load(f)["latency"]
+        except FileNotFoundError:
+            pass
+
+    def describe(data, count, unit):
+        kind = "สังเคราะห์ (เขียนขึ้นเอง)" if data.get("synthetic") else f"บันทึกจริง {data.get('recorded_at', '')}".strip()
+        return f"{kind}: {count} {unit}"
+
+    if ohlcv:
+        prices = f"บันทึกจริง: OHLCV {len(ohlcv)} หุ้น, latency {price_latency:.2f} วินาที (วัดตอนบันทึก)"
+    else:
+        prices = f"สังเคราะห์: random walk ของ LocalPriceSource, latency {price_latency:.2f} วินาที (ค่าประมาณ)"
+    sources = {"prices": prices, "news": describe(news_data, len(news), "query"), "llm": describe(llm_data, len(llm), "คำตอบ")}
+    return {"news": news, "llm": llm, "ohlcv": ohlcv, "price_latency": price_latency, "sources": sources}
+
+
+class ReplayPriceSource(LocalPriceSource):
+    """เล่นซ้ำ OHLCV ที่บันทึกไว้ (หุ้นที่ไม่มีใน fixtures ใช้ random walk ของ LocalPriceSource) พร้อมหน่วงเวลา"""
+
+    def __init__(self, frames=None, latency=0.0):
+        super().__init__(frames=frames)
+        self.latency = latency
+
+    def download(self, tickers, period="30d", interval="1d", start=None):
+        time.sleep(self.latency)
+        return super().download(tickers, period=period, interval=interval, start=start)
+
+
+class ReplayNewsClient:
+    """แทน NewsApiClient: คืนผลที่บันทึกไว้ของ query นั้น ถ้าไม่มีจะเลือกชุดหนึ่งตาม crc32 ของ query
+
+    ข่าวที่ใช้ซ้ำกับ query อื่นจะเติม query ต่อท้ายหัวข้อ แคชผลวิเคราะห์จึงไม่ hit ข้ามหุ้นแบบที่ไม่เกิดขึ้นจริง
+    """
+
+    def __init__(self, payloads, latency_scale=1.0):
+        self.payloads = payloads
+        self.queries = sorted(payloads)
+        self.latency_scale = latency_scale
+
+    def get_top_headlines(self, q=None, **kwargs):
+        recorded = self.payloads.get(q)
+        if recorded is None:
+            recorded = self.payloads[self.queries[zlib.crc32(q.encode()) % len(self.queries)]]
+            articles = [dict(article, title=f"{article['title']} ({q})") for article in recorded["response"]["articles"]]
+            response = dict(recorded["response"], articles=articles)
+        else:
+            response = recorded["response"]
+        time.sleep(recorded["latency"] * self.latency_scale)
+        return response
+
+
+def replay_llm(responses, latency_scale=1.0):
+    """FakeLLM ที่ตอบด้วยคำตอบที่บันทึกไว้ (เลือกตาม crc32 ของ prompt) และหน่วงเวลาตาม latency ที่วัดได้"""
+    def responder(prompt):
+        recorded = responses[zlib.crc32(prompt.encode()) % len(responses)]
+        time.sleep(recorded["latency"] * latency_scale)
+        return recorded["text"]
+    return FakeLLM(latency=0, chunk_delay=0, responder=responder)
+
+
+def make_universe(size):
+    """หุ้นจริงของพอร์ต/Watchlist ก่อน แล้วเติมด้วยชื่อสมมติจนครบ size"""
+    tickers = sorted(ALL_TICKERS)[:size]
+    tickers += [f"BENCH{i:04d}" for i in range(size - len(tickers))]
+    return tickers
+
+
+def install_fixtures(fixtures, universe, latency_scale):
+    """สลับ client ภายนอกใน core เป็นตัวเล่นซ้ำ ส่วนแคชข่าว/ผลวิเคราะห์ใช้ของจริง (ล้างก่อนเริ่ม)"""
+    recorded = list(fixtures["ohlcv"].values())
+    frames = {ticker: recorded[i % len(recorded)] for i, ticker in enumerate(universe)} if recorded else None
+    source = ReplayPriceSource(frames, latency=fixtures["price_latency"] * latency_scale)
+    # INVEST_DATA_DIR ที่ผู้ใช้ตั้งเองอาจยังไม่มีโฟลเดอร์
+    os.makedirs(DATA_DIR, exist_ok=True)
+    store = PriceStore(root=tempfile.mkdtemp(prefix="prices-", dir=DATA_DIR), source=source)
+    news_client = ReplayNewsClient(fixtures["news"], latency_scale=latency_scale)
+    llm_client = replay_llm(fixtures["llm"], latency_scale=latency_scale)
+    # ไม่จำกัดอัตรา เพื่อวัดเวลาของโค้ดเราเอง ไม่ใช่เวลารอคิว NewsAPI
+    limiter = SharedRateLimiter(f"bench-{len(universe)}-{time.time()}", rate=1e9, burst=1e9, daily_budget=10**9)
+
+    core.get_price_store = lambda: store
+    core.get_news_client = lambda: news_client
+    core.get_news_limiter = lambda: limiter
+    core.get_llm_client = lambda: llm_client
+    core.clear_indicator_snapshots()
+    core.get_news_cache().clear()
+    core.get_analysis_cache().clear()
+
+
+# ========== Measurement ==========
+def _reset_peak_rss():
+    """ตั้งค่า RSS สูงสุดของ process ให้เท่าค่าปัจจุบัน (Linux เท่านั้น ที่อื่นค่าสูงสุดนับสะสมทั้ง process)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mib():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return float("nan")
+    # ru_maxrss เป็น KB บน Linux แต่เป็น byte บน macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def measure(stage, size, operations):
+    """รัน operations ทีละตัว แล้วคืน throughput, latency p50/p99, RSS สูงสุดระหว่างขั้นตอน และ cache hit ratio
+
+    ใช้ RSS แทน tracemalloc เพราะ tracemalloc ทำให้โค้ด pandas ช้าลงหลายเท่าจน latency ที่วัดไม่ตรงกับของจริง
+    """
+    telemetry.REGISTRY.reset()
+    _reset_peak_rss()
+    latencies = []
+    started = time.perf_counter()
+    for operation in operations:
+        op_started = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - op_started)
+    elapsed = time.perf_counter() - started
+    return _result(stage, size, latencies, elapsed, _peak_rss_mib())
+
+
+def _result(stage, size, latencies, elapsed, peak_rss_mib):
+    ratios = telemetry.REGISTRY.cache_ratios()
+    return {
+        "stage": stage,
+        "tickers": size,
+        "ops": len(latencies),
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else float("inf"),
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+        "peak_rss_mib": peak_rss_mib,
+        "cache_hit_ratio": {name: entry["ratio"] for name, entry in ratios.items()},
+    }
+
+
+def measure_import(module, repeats=5):
+    """เวลา import module ใน interpreter ใหม่ทุกครั้ง (เท่ากับ cold start ของ container/worker)"""
+    # ru_maxrss ของ process ลูกติดค่าของ process แม่มาหลัง exec จึงอ่าน VmHWM แทนเมื่อทำได้
+    code = (
+        "import time; started = time.perf_counter(); import " + module + "; elapsed = time.perf_counter() - started\n"
+        "try:\n"
+        "    peak = next(int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmHWM:'))\n"
+        "except OSError:\n"
+        "    import resource; peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "print(elapsed, peak)"
+    )
+    telemetry.REGISTRY.reset()
+    latencies, peaks = [], []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+        elapsed, peak = output.stdout.split()[-2:]
+        latencies.append(float(elapsed))
+        peaks.append(int(peak) / 1024)
+    return _result(f"import_{module}", 0, latencies, sum(latencies), max(peaks))
+
+
+def measure_app(fixtures, reruns=10, latency_scale=0.01):
+    """เวลารัน main.py ครั้งแรกและตอน rerun (เช่นหลังผู้ใช้กดปุ่ม) ผ่าน streamlit.testing ด้วยข้อมูลเล่นซ้ำ"""
+    from streamlit.testing.v1 import AppTest
+
+    universe = sorted(ALL_TICKERS)
+    install_fixtures(fixtures, universe, latency_scale)
+    app = AppTest.from_file(os.path.join(ROOT_DIR, "main.py"), default_timeout=600)
+
+    def run():
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+
+    return [
+        measure("app_first_run", len(universe), [run]),
+        measure("app_rerun", len(universe), [run] * reruns),
+    ]
+
+
+def run_size(fixtures, size, latency_scale=0.01, price_calls=10, articles_per_ticker=4):
+    """วัดทุกขั้นตอนที่จำนวนหุ้น size (ครั้งแรก = cold, ครั้งที่สอง = อ่านจากคลัง/แคช)"""
+    universe = make_universe(size)
+    install_fixtures(fixtures, universe, latency_scale)
+    tickers = tuple(universe)
+    results = []
+
+    # ราคา: ครั้งแรกดึงทุกหุ้นเข้าคลังและคำนวณ snapshot, snapshot = คำนวณทั้งชุดใหม่จากคลัง (แบบหลังแคชหมดอายุ)
+    # prices = อ่านแถวของหุ้นจาก snapshot ที่คำนวณไว้
+    results.append(measure("prices_cold", size, [
+        lambda: core.get_stock_price_and_indicators(universe[0], tickers=tickers, notify=_silent),
+    ]))
+    results.append(measure("snapshot", size, [
+        lambda: core.get_indicator_snapshot(tuple(sorted(tickers)), notify=_silent, max_age=0),
+    ] * 3))
+    sample = universe[::max(1, size // price_calls)][:price_calls]
+    results.append(measure("prices", size, [
+        (lambda t=t: core.get_stock_price_and_indicators(t, tickers=tickers, notify=_silent)) for t in sample
+    ]))
+
+    news = {}
+
+    def fetch_news(ticker):
+        news[ticker] = core.get_news_for_ticker(ticker, notify=_silent)
+
+    results.append(measure("news_cold", size, [(lambda t=t: fetch_news(t)) for t in universe]))
+    results.append(measure("news_warm", size, [(lambda t=t: fetch_news(t)) for t in universe]))
+
+    articles = [article for ticker in universe for article in news[ticker][:articles_per_ticker]]
+    analyze = [(lambda a=a: core.analyze_sentiment_and_summarize(a)) for a in articles]
+    results.append(measure("analysis_cold", size, analyze))
+    results.append(measure("analysis_warm", size, analyze))
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta_ms=1.0, min_seconds=0.1):
+    """เทียบกับผลครั้งก่อน คืนรายการขั้นตอนที่แย่ลงเกิน tolerance (สัดส่วน เช่น 0.2 = 20%)
+
+    ไม่นับ p99 ที่ต่างกันน้อยกว่า min_delta_ms และ throughput ของขั้นตอนที่จบเร็วกว่า min_seconds ซึ่งแกว่งตามเครื่องเป็นหลัก
+    """
+    previous = {(r["stage"], r["tickers"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["stage"], result["tickers"]))
+        if before is None:
+            continue
+        slower = result["p99_ms"] - before["p99_ms"] > min_delta_ms
+        long_enough = min(result["seconds"], before["seconds"]) >= min_seconds
+        checks = [
+            ("p99_ms", slower and result["p99_ms"] > before["p99_ms"] * (1 + tolerance)),
+            ("throughput", long_enough and result["throughput"] < before["throughput"] * (1 - tolerance)),
+            ("peak_rss_mib", result["peak_rss_mib"] > before["peak_rss_mib"] * (1 + tolerance)),
+        ]
+        for metric, worse in checks:
+            if worse:
+                regressions.append(f"{result['stage']}@{result['tickers']}: {metric} {before[metric]:.2f} → {result[metric]:.2f}")
+    return regressions
+
+
+# ========== Recording ==========
+class RecordingNewsClient:
+    """ห่อ NewsApiClient จริง แล้วเก็บผลตอบกลับกับเวลาที่ใช้ตาม query"""
+
+    def __init__(self, client):
+        self.client = client
+        self.payloads = {}
+
+    def get_top_headlines(self, q=None, **kwargs):
+        started = time.perf_counter()
+        response = self.client.get_top_headlines(q=q, **kwargs)
+        self.payloads[q] = {"latency": round(time.perf_counter() - started, 3), "response": response}
+        return response
+
+
+class RecordingLLM:
+    """ห่อ LLM client จริง แล้วเก็บคำตอบกับเวลาที่ใช้"""
+
+    def __init__(self, client):
+        self.client = client
+        self.model = client.model
+        self.responses = []
+
+    def complete(self, prompt, max_tokens=None):
+        started = time.perf_counter()
+        text = self.client.complete(prompt, max_tokens=max_tokens)
+        self.responses.append({"latency": round(time.perf_counter() - started, 3), "text": text})
+        return text
+
+
+def record(tickers, path=FIXTURES_DIR, articles_per_ticker=2):
+    """บันทึก fixtures ใหม่จาก Yahoo Finance, NewsAPI และ OpenAI (ใช้ quota จริง)"""
+    ohlcv_dir = os.path.join(path, OHLCV_DIR)
+    os.makedirs(ohlcv_dir, exist_ok=True)
+    recorded_at = time.strftime("%Y-%m-%d")
+    started = time.perf_counter()
+    wide = YahooPriceSource().download(tickers, period="1y")
+    latency = round(time.perf_counter() - started, 3)
+    for ticker in tickers:
+        frame = wide.xs(ticker, axis=1, level=1).dropna(how="all") if ticker in wide.columns.get_level_values(1) else None
+        if frame is not None and len(frame):
+            frame.to_parquet(os.path.join(ohlcv_dir, f"{ticker}.parquet"))
+    with open(os.path.join(ohlcv_dir, "manifest.json"), "w") as f:
+        json.dump({"latency": latency, "tickers": list(tickers), "recorded_at": recorded_at}, f)
+
+    news_client = RecordingNewsClient(core.get_news_client())
+    llm_client = RecordingLLM(core.get_llm_client())
+    core.get_news_client = lambda: news_client
+    core.get_llm_client = lambda: llm_client
+    for ticker in tickers:
+        for article in core.get_news_for_ticker(ticker)[:articles_per_ticker]:
+            core.analyze_sentiment_and_summarize(article)
+
+    with open(os.path.join(path, NEWS_FIXTURE), "w") as f:
+        json.dump({"description": "ผลตอบกลับจาก NewsAPI get_top_headlines ตาม query (latency เป็นวินาทีที่วัดได้ตอนบันทึก)",
+                   "synthetic": False, "recorded_at": recorded_at, "payloads": news_client.payloads}, f, ensure_ascii=False, indent=2)
+    if llm_client.responses:
+        with open(os.path.join(path, LLM_FIXTURE), "w") as f:
+            json.dump({"description": "คำตอบจาก LLM สำหรับ prompt วิเคราะห์ข่าว (latency เป็นวินาทีที่วัดได้ตอนบันทึก)",
+                       "synthetic": False, "recorded_at": recorded_at, "responses": llm_client.responses}, f, ensure_ascii=False, indent=2)
+    print(f"บันทึก {len(news_client.payloads)} query, {len(llm_client.responses)} คำตอบ LLM ลง {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark แบบออฟไลน์ของราคา/ข่าว/วิเคราะห์ข่าว")
+    parser.add_argument("--sizes", nargs="*", type=int, default=DEFAULT_SIZES, help="จำนวนหุ้นที่ต้องการวัด")
+    parser.add_argument("--latency-scale", type=float, default=0.01,
+                        help="คูณ latency ที่บันทึกไว้ (1 = เท่าของจริง, 0 = ไม่หน่วงเลย)")
+    parser.add_argument("--price-calls", type=int, default=10, help="จำนวนครั้งที่วัด get_stock_price_and_indicators")
+    parser.add_argument("--app-reruns", type=int, default=10, help="จำนวน rerun ของ main.py ที่วัด (0 = ข้าม)")
+    parser.add_argument("--import-repeats", type=int, default=5, help="จำนวนครั้งที่วัดเวลา import (0 = ข้าม)")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--output", help="บันทึกผลเป็น JSON")
+    parser.add_argument("--baseline", help="ผล JSON ครั้งก่อนสำหรับตรวจว่าช้าลงหรือไม่")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="ยอมให้แย่ลงได้ไม่เกินสัดส่วนนี้")
+    parser.add_argument("--record", action="store_true", help="บันทึก fixtures ใหม่จาก API จริง")
+    parser.add_argument("--tickers", nargs="+", default=sorted(ALL_TICKERS), help="หุ้นที่ใช้ตอน --record")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.record:
+            record(args.tickers, path=args.fixtures)
+            return 0
+
+        fixtures = load_fixtures(args.fixtures)
+        for stage, source in fixtures["sources"].items():
+            print(f"แหล่งข้อมูล {stage}: {source}")
+        results = []
+        if args.import_repeats:
+            for module in ("streamlit", "core"):
+                results.append(measure_import(module, repeats=args.import_repeats))
+        if args.app_reruns or args.sizes:
+            # รอบอุ่นเครื่อง (ไม่นับผล) ให้ import แบบ lazy ของ pyarrow/pandas เสร็จก่อนเริ่มวัด
+            run_size(fixtures, 2, latency_scale=0, price_calls=1)
+        if args.app_reruns:
+            results.extend(measure_app(fixtures, reruns=args.app_reruns, latency_scale=args.latency_scale))
+        for size in args.sizes:
+            results.extend(run_size(fixtures, size, latency_scale=args.latency_scale, price_calls=args.price_calls))
+
+        table = pd.DataFrame(results).drop(columns="cache_hit_ratio")
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = compare(results, json.load(f), args.tolerance)
+            for line in regressions:
+                print(f"❌ {line}")
+            return 1 if regressions else 0
+        return 0
+    finally:
+        if _TEMP_DATA_DIR is not None:
+            shutil.rmtree(_TEMP_DATA_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
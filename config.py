@@ -0,0 +1,56 @@
+"""ค่าตั้งต้นที่ใช้ร่วมกันระหว่าง dashboard และ module อื่น ๆ"""
+import os
+
+from ticker_registry import TickerRegistry
+
+# รายชื่อพอร์ต/Watchlist และข้อมูลหุ้น (ชื่อ, sector, คำค้นข่าว) อยู่ในไฟล์ JSON ไฟล์เดียว
+TICKERS_FILE = os.environ.get("INVEST_TICKERS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tickers.json"))
+TICKER_REGISTRY = TickerRegistry.from_file(TICKERS_FILE)
+
+PORT_STOCKS = list(TICKER_REGISTRY.portfolio)  # Portfolio
+WATCHLIST = list(TICKER_REGISTRY.watchlist)  # Watchlist
+ALL_TICKERS = list(TICKER_REGISTRY.all_tickers)
+
+NEWS_CACHE_TTL = 6 * 60 * 60  # 6 ชั่วโมง
+PRICE_MAX_AGE = 300  # sync ราคาจาก upstream ไม่บ่อยกว่าทุก 5 นาที
+INDICATOR_SNAPSHOT_TTL = 300  # ใช้ผลคำนวณตัวชี้วัดของชุดหุ้นเดิมซ้ำได้ 5 นาที
+LIVE_POLL_SECONDS = int(os.environ.get("INVEST_LIVE_POLL_SECONDS", 60))  # โหมด Live: poll แท่ง 1 นาที
+
+# โฟลเดอร์เก็บข้อมูลถาวร (ใช้ร่วมกันทุก worker บนเครื่องเดียวกัน)
+DATA_DIR = os.environ.get("INVEST_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"))
+PRICE_STORE_DIR = os.path.join(DATA_DIR, "prices")
+
+# แคชกลางของข่าว/ผลวิเคราะห์: "sqlite" ใช้ร่วมกันทุก worker, "memory" ใช้ภายใน process เดียว
+CACHE_BACKEND = os.environ.get("INVEST_CACHE_BACKEND", "sqlite")
+CACHE_DB_PATH = os.path.join(DATA_DIR, "cache.sqlite")
+
+# NewsAPI: เว้นระยะเฉลี่ย 15 วินาที/คำขอ (สะสมได้ 4 คำขอ) และไม่เกิน 80 คำขอ/วัน รวมทุก session
+RATE_LIMIT_DB_PATH = os.path.join(DATA_DIR, "ratelimit.sqlite")
+NEWSAPI_MIN_INTERVAL = float(os.environ.get("INVEST_NEWSAPI_MIN_INTERVAL", 15))
+NEWSAPI_BURST = int(os.environ.get("INVEST_NEWSAPI_BURST", 4))
+NEWSAPI_DAILY_BUDGET = int(os.environ.get("INVEST_NEWSAPI_DAILY_BUDGET", 80))
+NEWSAPI_MAX_WAIT = float(os.environ.get("INVEST_NEWSAPI_MAX_WAIT", 10))
+
+# ใช้ LLM จำลองแทน OpenAI (สำหรับรัน dashboard แบบออฟไลน์)
+FAKE_LLM = os.environ.get("INVEST_FAKE_LLM") == "1"
+
+# แคชผลวิเคราะห์ข่าวแบบถาวร (ไม่มี TTL) จำกัดด้วยจำนวนรายการและขนาดรวม
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get("INVEST_ANALYSIS_CACHE_MAX_ENTRIES", 20000))
+ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get("INVEST_ANALYSIS_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+# ค่าเริ่มต้นของโหมดวิเคราะห์ข่าวแบบ batch (หลายข่าวในคำขอเดียว)
+LLM_BATCH_MODE = os.environ.get("INVEST_LLM_BATCH") == "1"
+
+# dashboard อ่านเฉพาะข้อมูลที่ pipeline.py เตรียมไว้ ไม่เรียก Yahoo/NewsAPI/OpenAI ระหว่างโหลดหน้า
+PRECOMPUTED_ONLY = os.environ.get("INVEST_PRECOMPUTED_ONLY") == "1"
+
+# แสดงแผงสถิติเวลา/แคช/fallback ท้ายหน้า (เปิดเฉพาะครั้งได้ด้วย ?debug=1)
+DEBUG_PANEL = os.environ.get("INVEST_DEBUG_PANEL") == "1"
+
+
+def get_secret(name):
+    """อ่าน API key จาก environment ก่อน ถ้าไม่มีจึงอ่านจาก st.secrets (ใช้ได้ทั้งใน/นอก Streamlit)"""
+    if name in os.environ:
+        return os.environ[name]
+    import streamlit as st
+    return st.secrets[name]
@@ -0,0 +1,326 @@
+"""ฟังก์ชันหลักของ dashboard (ราคา, ตัวชี้วัด, ข่าว, วิเคราะห์ข่าว) ที่ import ได้โดยไม่ต้องรัน Streamlit
+
+ข้อความสถานะส่งผ่าน notify(level, message) โดย level เป็น "info", "success", "warning" หรือ "error"
+dashboard ส่ง notify ที่แสดงผลด้วย st.info/st.warning/... ส่วน pipeline ใช้ค่าเริ่มต้นที่เขียนลง log
+"""
+import datetime
+import functools
+import logging
+import time
+
+import pandas as pd
+
+import telemetry
+from config import (
+    ALL_TICKERS,
+    ANALYSIS_CACHE_MAX_BYTES,
+    ANALYSIS_CACHE_MAX_ENTRIES,
+    FAKE_LLM,
+    INDICATOR_SNAPSHOT_TTL,
+    LIVE_POLL_SECONDS,
+    NEWS_CACHE_TTL,
+    NEWSAPI_BURST,
+    NEWSAPI_DAILY_BUDGET,
+    NEWSAPI_MAX_WAIT,
+    NEWSAPI_MIN_INTERVAL,
+    PRICE_MAX_AGE,
+    TICKER_REGISTRY,
+    get_secret,
+)
+from indicators import compute_indicators, latest
+from live import LivePoller
+from llm import FakeLLM, OpenAIChatClient, analysis_key, analyze_article
+from market_data import PriceBatch, period_to_days
+from price_store import PriceStore
+from rate_limiter import SharedRateLimiter, SingleFlight
+from shared_cache import make_cache
+
+logger = logging.getLogger(__name__)
+
+_LOG_LEVELS = {"info": logging.INFO, "success": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+
+def log_notify(level, message):
+    logger.log(_LOG_LEVELS.get(level, logging.INFO), message)
+
+
+# ========== Shared Resources ==========
+# สร้างครั้งเดียวต่อ process แล้วใช้ร่วมกันทุก session (แทน st.cache_resource เพื่อให้ใช้นอก Streamlit ได้)
+# client ภายนอก (newsapi, openai, yfinance) import และสร้างตอนใช้ครั้งแรก ไม่ใช่ตอน import core
+@functools.lru_cache(maxsize=None)
+def get_price_store():
+    """คลังราคาบนดิสก์ ใช้ร่วมกันทุก session และทุก worker"""
+    return PriceStore()
+
+@functools.lru_cache(maxsize=None)
+def get_news_client():
+    from newsapi import NewsApiClient
+
+    return NewsApiClient(api_key=get_secret("NEWS_API_KEY"))
+
+@functools.lru_cache(maxsize=None)
+def get_news_cache():
+    """แคชข่าวกลาง ใช้ร่วมกันทุก session (และทุก worker เมื่อใช้ SQLite)"""
+    return make_cache("news", max_entries=1000)
+
+@functools.lru_cache(maxsize=None)
+def get_news_limiter():
+    """ตัวจำกัดอัตรา + โควตารายวันของ NewsAPI ที่นับรวมทุก session และทุก worker"""
+    return SharedRateLimiter(
+        "newsapi",
+        rate=1 / NEWSAPI_MIN_INTERVAL,
+        burst=NEWSAPI_BURST,
+        daily_budget=NEWSAPI_DAILY_BUDGET,
+    )
+
+@functools.lru_cache(maxsize=None)
+def get_news_single_flight():
+    return SingleFlight()
+
+@functools.lru_cache(maxsize=None)
+def get_llm_client():
+    """LLM client ที่ใช้ร่วมกันทุก session (INVEST_FAKE_LLM=1 ใช้ตัวจำลองแบบออฟไลน์)"""
+    if FAKE_LLM:
+        return FakeLLM()
+    return OpenAIChatClient(api_key=get_secret("OPENAI_API_KEY"))
+
+@functools.lru_cache(maxsize=None)
+def get_live_poller():
+    """thread poll ราคา 1 นาทีของหุ้นที่เปิดดูอยู่ (หนึ่งตัวต่อ process)"""
+    return LivePoller(interval=LIVE_POLL_SECONDS)
+
+@functools.lru_cache(maxsize=None)
+def get_analysis_cache():
+    """แคชผลวิเคราะห์ถาวร key เป็น hash ของเนื้อหาข่าว ข่าวเดิมจึงไม่ถูกส่งให้ LLM ซ้ำ"""
+    return make_cache("analysis", max_entries=ANALYSIS_CACHE_MAX_ENTRIES, max_bytes=ANALYSIS_CACHE_MAX_BYTES)
+
+# โควตา NewsAPI อ่านจากตัวนับกลางตอนส่งออกสถิติ
+telemetry.gauge("newsapi_quota_used", lambda: get_news_limiter().used_today())
+telemetry.gauge("newsapi_quota_remaining", lambda: get_news_limiter().remaining_today())
+
+
+# ========== Prices & Indicators ==========
+def get_price_batch(tickers, period="30d", refresh=True, notify=log_notify):
+    """ดึงเฉพาะแท่งใหม่ของทุกหุ้นเข้าคลังบนดิสก์ แล้วอ่านช่วง period ล่าสุดออกมา
+
+    refresh=False อ่านจากคลังอย่างเดียว (ใช้เมื่อ pipeline เตรียมข้อมูลไว้แล้ว)
+    """
+    store = get_price_store()
+    if refresh:
+        try:
+            store.sync(tickers, max_age=PRICE_MAX_AGE)
+        except Exception as e:
+            telemetry.fallback("stale_prices")
+            notify("warning", f"⚠️ อัปเดตราคาไม่สำเร็จ ใช้ข้อมูลล่าสุดในคลัง: {str(e)}")
+    since = pd.Timestamp.today().normalize() - pd.Timedelta(days=period_to_days(period))
+    return store.load(tickers, since=since)
+
+# snapshot ล่าสุดของแต่ละชุดหุ้น → (เวลาคำนวณ, DataFrame) ใช้ซ้ำภายใน process เหมือน st.cache_data ของ dashboard
+_snapshot_memo = {}
+_snapshot_flight = SingleFlight()
+SNAPSHOT_MEMO_SIZE = 32
+
+def get_indicator_snapshot(tickers, refresh=True, notify=log_notify, max_age=INDICATOR_SNAPSHOT_TTL):
+    """คำนวณ RSI/EMA/% เปลี่ยนแปลง ของทุกหุ้นพร้อมกันจากเมทริกซ์ราคา
+
+    ชุดหุ้นเดิมที่คำนวณไว้ไม่เกิน max_age วินาทีจะคืนผลเดิม (ห้ามแก้ DataFrame ที่ได้) max_age=0 คำนวณใหม่เสมอ
+    """
+    key = (tuple(tickers), refresh)
+    with _snapshot_flight.lock(key):
+        if max_age > 0:
+            entry = _snapshot_memo.get(key)
+            fresh = entry is not None and time.time() - entry[0] < max_age
+            telemetry.cache("indicator_snapshot", hit=fresh)
+            if fresh:
+                return entry[1]
+        batch = PriceBatch(get_price_batch(key[0], refresh=refresh, notify=notify))
+        indicators = compute_indicators(batch.close_matrix(), high=batch.field("High"), low=batch.field("Low"))
+        snapshot = latest(indicators)
+        if max_age > 0:
+            _snapshot_memo.pop(key, None)
+            _snapshot_memo[key] = (time.time(), snapshot)
+            # เก็บเฉพาะชุดที่ใช้ล่าสุด (ผู้ใช้พิมพ์หุ้นใน screener ได้ไม่จำกัด)
+            while len(_snapshot_memo) > SNAPSHOT_MEMO_SIZE:
+                _snapshot_memo.pop(next(iter(_snapshot_memo)), None)
+        return snapshot
+
+def clear_indicator_snapshots():
+    _snapshot_memo.clear()
+
+def stock_data_from_snapshot(snapshot, ticker, notify=log_notify):
+    """แปลงแถวของ ticker ใน snapshot เป็น dict ที่ dashboard ใช้ (ไม่มีข้อมูล → ใช้ค่า Mock)"""
+    try:
+        if ticker not in snapshot.index or pd.isna(snapshot.at[ticker, "price"]):
+            raise Exception(f"ไม่พบข้อมูลสำหรับ {ticker}")
+
+        row = snapshot.loc[ticker]
+        return {
+            "price": round(row["price"], 2),
+            "rsi": round(row["rsi"], 2),
+            "ema": round(row["ema"], 2),
+            "change": round(row["change"], 2)
+        }
+    except Exception as e:
+        notify("error", f"❌ ไม่สามารถดึงข้อมูลราคาหุ้น {ticker}: {str(e)}")
+        # ใช้ข้อมูล Mock เป็น fallback
+        telemetry.fallback("mock_price", reason="no_data")
+        return {
+            "price": round(100 + hash(ticker) % 100, 2),
+            "rsi": 30 + hash(ticker + "rsi") % 40,
+            "ema": round(95 + hash(ticker + "ema") % 10, 2),
+            "change": round(-5 + hash(ticker + "change") % 10, 2)
+        }
+
+def refresh_prices(tickers):
+    """ดึงเฉพาะแท่งที่เปลี่ยนไปเข้าคลังทันที (ไม่สนใจ PRICE_MAX_AGE) แล้วล้าง snapshot ที่คำนวณไว้"""
+    fetched = get_price_store().sync(tickers)
+    clear_indicator_snapshots()
+    return fetched
+
+def get_live_stock_data(ticker):
+    """ราคาและตัวชี้วัดจากราคา live ล่าสุด (ยังไม่มีราคา live → None)
+
+    ใช้แท่งรายวันในคลังที่ปิดแล้ว (ก่อนวันของราคา live) ในช่วงเดียวกับ dashboard เป็นฐานของ RSI/EMA
+    """
+    poller = get_live_poller()
+    poller.watch([ticker])
+    if poller.quote(ticker) is None:
+        # เพิ่งเริ่มดูหุ้นนี้ → ดึงรอบแรกทันทีแทนการรอรอบถัดไปของ thread
+        poller.poll_once()
+    history = PriceBatch(get_price_batch([ticker], refresh=False)).history(ticker)
+    if history.empty:
+        return None
+    values = poller.indicators(ticker, history["Close"].dropna())
+    if values is None:
+        return None
+    return {
+        "price": round(values["price"], 2),
+        "rsi": round(values["rsi"], 2),
+        "ema": round(values["ema"], 2),
+        "change": round(values["change"], 2),
+        "as_of": values["as_of"],
+    }
+
+def get_stock_price_and_indicators(ticker, tickers=None, notify=log_notify):
+    """ดึงราคาหุ้นจริงผ่าน Yahoo Finance (อ่านแถวของหุ้นจาก snapshot ของทุกหุ้นที่คำนวณไว้)"""
+    snapshot = get_indicator_snapshot(tuple(sorted(tickers or ALL_TICKERS)), notify=notify)
+    return stock_data_from_snapshot(snapshot, ticker, notify=notify)
+
+
+# ========== News ==========
+def get_news_for_ticker(ticker, allow_fetch=True, max_wait=NEWSAPI_MAX_WAIT, notify=log_notify):
+    """ดึงข่าวพร้อม Rate Limiting Protection และ Multiple Sources
+
+    allow_fetch=False อ่านจากแคชอย่างเดียว ไม่มีในแคชจะใช้ข่าวจาก Alternative Sources
+    """
+
+    # ✅ ใช้แคชกลางที่แชร์ทุก session/worker เพื่อลดการเรียกซ้ำ (Cache นาน 6 ชั่วโมง)
+    news_cache = get_news_cache()
+    cached_articles = news_cache.get(ticker)
+    if cached_articles is not None:
+        notify("info", "📋 ใช้ข้อมูลข่าวจาก Cache เพื่อประหยัด API Quota")
+        return cached_articles
+
+    if not allow_fetch:
+        telemetry.fallback("alternative_news", reason="precomputed_only")
+        return get_alternative_news(ticker, notify=notify)
+
+    # หลาย session ขอหุ้นเดียวกันพร้อมกัน → ให้เรียก API แค่ครั้งเดียว ที่เหลือรอใช้ผลจากแคช
+    with get_news_single_flight().lock(ticker):
+        cached_articles = news_cache.get(ticker)
+        if cached_articles is not None:
+            return cached_articles
+
+        # ตรวจสอบ API Quota และ Rate Limiting (ตัวนับกลาง) ถ้า token ยังไม่พอให้รอคิวสั้น ๆ
+        limiter = get_news_limiter()
+        permit = limiter.acquire(max_wait=max_wait)
+        if not permit.granted:
+            if permit.retry_after is None:
+                telemetry.fallback("alternative_news", reason="quota_exhausted")
+                notify("warning", "⚠️ API Quota ใกล้หมดแล้ว ใช้ข้อมูล Alternative Sources")
+            else:
+                telemetry.fallback("alternative_news", reason="rate_limited")
+                notify("warning", f"⏳ รอ {int(permit.retry_after) + 1} วินาที เพื่อป้องกัน Rate Limit")
+            return get_alternative_news(ticker, notify=notify)
+
+        # ระหว่างรอคิว worker อื่นอาจดึงข่าวหุ้นนี้มาแล้ว → คืนสิทธิ์แล้วใช้ผลนั้น
+        cached_articles = news_cache.get(ticker)
+        if cached_articles is not None:
+            limiter.refund()
+            return cached_articles
+
+        # ลองเรียก API
+        try:
+            query_term = TICKER_REGISTRY.query(ticker)
+
+            # ใช้ get_top_headlines แทน get_everything (ใช้ quota น้อยกว่า)
+            with telemetry.timed("newsapi", call="top_headlines"):
+                articles = get_news_client().get_top_headlines(
+                    q=query_term,
+                    language="en",
+                    category="business",
+                    page_size=6
+                )
+
+            if articles["status"] == "ok" and articles.get("articles"):
+                filtered_articles = [art for art in articles["articles"] if art.get("title") and art.get("description")][:4]
+                news_cache.set(ticker, filtered_articles, ttl=NEWS_CACHE_TTL)  # Cache นาน 6 ชั่วโมง
+                notify("success", f"✅ ดึงข่าวสำเร็จ ({len(filtered_articles)} ข่าว) - API Quota เหลือ: {limiter.remaining_today()}")
+                return filtered_articles
+            else:
+                raise Exception("No articles found")
+
+        except Exception as e:
+            telemetry.fallback("alternative_news", reason="api_error")
+            notify("error", f"❌ News API ไม่สำเร็จ: {str(e)}")
+            return get_alternative_news(ticker, notify=notify)
+
+def get_alternative_news(ticker, notify=log_notify):
+    """ข่าวจากแหล่งอื่นเมื่อ News API หมด"""
+
+    company_info = TICKER_REGISTRY.get(ticker)
+
+    # ข่าวตัวอย่างที่มีเนื้อหาดี แบ่งตาม sector (กลุ่มและแนวโน้มมาจาก sector_buckets ใน tickers.json)
+    alternative_news = [
+        {
+            "title": f"📊 {company_info.name} ({ticker}) - การวิเคราะห์ล่าสุดจากผู้เชี่ยวชาญ",
+            "description": f"นักวิเคราะห์ให้ความเห็นเกี่ยวกับแนวโน้มของ {company_info.name} ในกลุ่ม{company_info.sector_context} ไตรมาสนี้ โดยมองว่า{company_info.sector_trend} จะส่งผลต่อการเติบโต",
+            "url": f"https://finance.yahoo.com/quote/{ticker}/news",
+            "publishedAt": datetime.datetime.now().isoformat(),
+            "source": "Yahoo Finance"
+        },
+        {
+            "title": f"💼 {company_info.name} เปิดเผยแผนยุทธศาสตร์ใหม่",
+            "description": f"ข้อมูลล่าสุดจาก {company_info.name} เกี่ยวกับการขยายตลาดและการลงทุนในเทคโนโลยีใหม่ ซึ่งอาจส่งผลกระทบต่อมูลค่าหุ้นในระยะยาว",
+            "url": f"https://finance.yahoo.com/quote/{ticker}",
+            "publishedAt": (datetime.datetime.now() - datetime.timedelta(hours=2)).isoformat(),
+            "source": "Market Analysis"
+        },
+        {
+            "title": f"📈 {ticker} ผลประกอบการและแนวโน้มตลาด",
+            "description": f"การวิเคราะห์ผลการดำเนินงานของ {company_info.name} พร้อมคาดการณ์แนวโน้มราคาหุ้นจากการเปลี่ยนแปลงของตลาดโลก",
+            "url": f"https://finance.yahoo.com/quote/{ticker}/analysis",
+            "publishedAt": (datetime.datetime.now() - datetime.timedelta(hours=4)).isoformat(),
+            "source": "Financial Analysis"
+        },
+        {
+            "title": f"🌐 ปัจจัยภายนอกที่ส่งผลต่อ {company_info.name}",
+            "description": f"การวิเคราะห์ปัจจัยต่างๆ ที่อาจส่งผลกระทบต่อ {company_info.name} เช่น {company_info.sector_trend} นโยบายรัฐบาล และการแข่งขันใน{company_info.sector_context}",
+            "url": f"https://finance.yahoo.com/quote/{ticker}/profile",
+            "publishedAt": (datetime.datetime.now() - datetime.timedelta(hours=6)).isoformat(),
+            "source": "Industry Report"
+        }
+    ]
+
+    notify("info", "📰 ใช้ข้อมูลข่าวจาก Alternative Sources เนื่องจาก News API Quota หมด")
+    return alternative_news
+
+
+# ========== News Analysis ==========
+def analyze_sentiment_and_summarize(article):
+    """วิเคราะห์ความรู้สึกและสรุปข่าว"""
+    return analyze_article(article, get_llm_client(), cache=get_analysis_cache())
+
+def get_cached_analysis(article):
+    """ผลวิเคราะห์ที่เตรียมไว้ในแคช (ไม่มี → None) โดยไม่เรียก LLM"""
+    return get_analysis_cache().get(analysis_key(article, model=get_llm_client().model))
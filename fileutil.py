@@ -0,0 +1,28 @@
+"""ตัวช่วยเขียนไฟล์ที่ใช้ร่วมกันหลายโมดูล"""
+import os
+import threading
+
+
+def atomic_write(path, write):
+    """เขียนไฟล์ชั่วคราวในโฟลเดอร์เดียวกันแล้ว rename ทับ เพื่อให้ผู้อ่าน (worker/process อื่น) ไม่เจอไฟล์ครึ่ง ๆ
+
+    write(tmp_path) เป็นฟังก์ชันที่เขียนข้อมูลลง path ที่ให้ ถ้าเขียนไม่สำเร็จจะลบไฟล์ชั่วคราวทิ้ง
+    """
+    # pid + thread id → ชื่อไม่ชนกันแม้หลาย process/thread เขียนไฟล์เดียวกันพร้อมกัน (สิทธิ์ไฟล์ตาม umask ปกติ)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path, text):
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    atomic_write(path, write)
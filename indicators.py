@@ -0,0 +1,279 @@
+"""คำนวณตัวชี้วัดทางเทคนิคของทุกหุ้นพร้อมกันจากเมทริกซ์ราคา (วันที่ × ticker)"""
+import copy
+import functools
+import json
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from fileutil import atomic_write_text
+
+
+def _own_bars(mask_from=0):
+    """ให้ฟังก์ชันตัวชี้วัดคำนวณแต่ละคอลัมน์บนแท่งที่มีข้อมูลของหุ้นนั้นเท่านั้น
+
+    เมทริกซ์รวมหลายหุ้นใช้วันที่ร่วมกัน หุ้นที่ไม่มีแท่งในวันนั้น (เช่นคริปโตวันเสาร์หรือวันหยุดของอีกตลาด)
+    จะเป็น NaN ถ้าปล่อยไว้ diff/shift/rolling/ewm จะนับ NaN เป็นแท่งด้วย จึงอัดแท่งที่มีข้อมูลของแต่ละคอลัมน์
+    ขึ้นไปติดกันก่อนคำนวณ แล้ววางผลกลับที่วันเดิม (วันที่ไม่มีแท่งได้ NaN) mask_from คือตำแหน่งของ argument ราคาปิด
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            reference = args[mask_from]
+            is_series = isinstance(reference, pd.Series)
+            frames = [arg.to_frame() if isinstance(arg, pd.Series) else arg for arg in args]
+            mask = frames[mask_from].notna().to_numpy()
+            if mask.all():
+                return func(*args, **kwargs)
+
+            # เรียงแถวของแต่ละคอลัมน์ให้แท่งที่มีข้อมูลขึ้นก่อน (คงลำดับเวลา) แท่งที่ไม่มีไปอยู่ท้าย
+            order = np.argsort(~mask, axis=0, kind="stable")
+            dense_args = [
+                pd.DataFrame(np.take_along_axis(frame.to_numpy(dtype=float), order, axis=0), columns=frame.columns)
+                for frame in frames
+            ]
+            result = func(*dense_args, **kwargs)
+
+            def expand(dense):
+                values = np.full(mask.shape, np.nan)
+                np.put_along_axis(values, order, dense.to_numpy(dtype=float), axis=0)
+                values[~mask] = np.nan
+                frame = pd.DataFrame(values, index=reference.index, columns=frames[mask_from].columns)
+                return frame.iloc[:, 0].rename(reference.name) if is_series else frame
+
+            if isinstance(result, tuple):
+                return tuple(expand(item) for item in result)
+            return expand(result)
+        return wrapper
+    return decorator
+
+
+@_own_bars()
+def pct_change(close, periods=1):
+    """% การเปลี่ยนแปลงเทียบกับแท่งก่อนหน้า"""
+    prev = close.shift(periods)
+    return (close - prev) / prev * 100
+
+
+@_own_bars()
+def sma(close, window=20):
+    return close.rolling(window=window).mean()
+
+
+@_own_bars()
+def ema(close, span=20, adjust=True):
+    """EMA แบบเดียวกับ dashboard (ewm(span=20), adjust=True)"""
+    return close.ewm(span=span, adjust=adjust).mean()
+
+
+@_own_bars()
+def rsi(close, window=14, method="sma"):
+    """RSI ของทุกคอลัมน์
+
+    method="sma" ใช้ค่าเฉลี่ยเคลื่อนที่ธรรมดา ตรงกับสูตรเดิมใน dashboard
+    method="wilder" ใช้ค่าเฉลี่ยแบบ Wilder (alpha = 1/window)
+    """
+    delta = close.diff()
+    # แถวแรกของ diff เป็น NaN → where(...) ให้ค่า 0 เหมือนสูตรเดิม
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    if method == "sma":
+        avg_gain = gain.rolling(window=window).mean()
+        avg_loss = loss.rolling(window=window).mean()
+    elif method == "wilder":
+        avg_gain = gain.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+        avg_loss = loss.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    else:
+        raise ValueError(f"ไม่รองรับ RSI method: {method}")
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+@_own_bars()
+def macd(close, fast=12, slow=26, signal=9):
+    """คืน (macd, signal, histogram)"""
+    line = ema(close, span=fast, adjust=False) - ema(close, span=slow, adjust=False)
+    signal_line = line.ewm(span=signal, adjust=False).mean()
+    return line, signal_line, line - signal_line
+
+
+@_own_bars()
+def bollinger(close, window=20, num_std=2):
+    """คืน (เส้นกลาง, เส้นบน, เส้นล่าง)"""
+    mid = close.rolling(window=window).mean()
+    std = close.rolling(window=window).std()
+    return mid, mid + num_std * std, mid - num_std * std
+
+
+@_own_bars(mask_from=2)
+def atr(high, low, close, window=14):
+    """Average True Range แบบ Wilder"""
+    prev_close = close.shift(1).to_numpy()
+    high_np, low_np = high.to_numpy(), low.to_numpy()
+    true_range = np.fmax(high_np - low_np, np.fmax(np.abs(high_np - prev_close), np.abs(low_np - prev_close)))
+    true_range = pd.DataFrame(true_range, index=close.index, columns=close.columns)
+    return true_range.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+
+
+def compute_indicators(close, high=None, low=None, rsi_window=14, ema_span=20):
+    """คำนวณตัวชี้วัดทั้งหมดของทุก ticker ในครั้งเดียว
+
+    close/high/low เป็น DataFrame (วันที่ × ticker) คืน dict ของชื่อตัวชี้วัด → DataFrame แบบเต็มช่วง
+    """
+    close = close.astype(float)
+    result = {
+        "price": close,
+        "change": pct_change(close),
+        "rsi": rsi(close, window=rsi_window),
+        "ema": ema(close, span=ema_span),
+        "sma": sma(close, window=ema_span),
+    }
+    result["macd"], result["macd_signal"], result["macd_hist"] = macd(close)
+    result["bb_mid"], result["bb_upper"], result["bb_lower"] = bollinger(close, window=ema_span)
+    if high is not None and low is not None:
+        result["atr"] = atr(high.reindex_like(close), low.reindex_like(close), close)
+    return result
+
+
+def latest(indicators):
+    """ค่าล่าสุดของทุกตัวชี้วัด → DataFrame (ticker × ตัวชี้วัด)"""
+    if indicators["price"].empty:
+        return pd.DataFrame(index=indicators["price"].columns, columns=list(indicators), dtype=float)
+    # ใช้ค่าล่าสุดที่มีของแต่ละหุ้น เผื่อบางตัวไม่มีแท่งของวันล่าสุด
+    last_valid = indicators["price"].notna()[::-1].idxmax()
+    positions = indicators["price"].index.get_indexer(last_valid)
+    columns = {}
+    for name, frame in indicators.items():
+        values = frame.to_numpy()
+        columns[name] = values[positions, np.arange(values.shape[1])]
+    return pd.DataFrame(columns, index=indicators["price"].columns)
+
+
+class StreamingIndicators:
+    """สถานะ RSI/EMA ของหุ้นหนึ่งตัว เลื่อนไปทีละแท่งได้ใน O(1)
+
+    ผลลัพธ์ตรงกับ rsi()/ema() แบบ batch: EMA เก็บตัวเศษ/ตัวส่วนของ ewm(adjust=True)
+    ส่วน RSI แบบ "sma" เก็บ gain/loss ย้อนหลัง window แท่ง และแบบ "wilder" เก็บค่าเฉลี่ยล่าสุด
+    """
+
+    def __init__(self, rsi_window=14, ema_span=20, rsi_method="sma"):
+        if rsi_method not in ("sma", "wilder"):
+            raise ValueError(f"ไม่รองรับ RSI method: {rsi_method}")
+        self.rsi_window = rsi_window
+        self.ema_span = ema_span
+        self.rsi_method = rsi_method
+        self.as_of = None
+        self.count = 0
+        self.last_close = None
+        self.prev_close = None
+        self.ema_num = 0.0
+        self.ema_den = 0.0
+        self.gains = deque(maxlen=rsi_window)
+        self.losses = deque(maxlen=rsi_window)
+        self.avg_gain = None
+        self.avg_loss = None
+
+    @classmethod
+    def from_history(cls, closes, **kwargs):
+        """สร้างสถานะจาก Series ราคาปิดย้อนหลัง"""
+        state = cls(**kwargs)
+        state.advance(closes)
+        return state
+
+    def update(self, close, timestamp=None):
+        """เพิ่มราคาปิดหนึ่งแท่ง"""
+        if close is None or math.isnan(close):
+            return self
+        close = float(close)
+        # แท่งแรกไม่มี delta → นับเป็น gain/loss = 0 เหมือน diff().where(...) ในสูตร batch
+        delta = 0.0 if self.last_close is None else close - self.last_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+
+        alpha = 2 / (self.ema_span + 1)
+        self.ema_num = close + (1 - alpha) * self.ema_num
+        self.ema_den = 1 + (1 - alpha) * self.ema_den
+
+        if self.rsi_method == "sma":
+            self.gains.append(gain)
+            self.losses.append(loss)
+        elif self.avg_gain is None:
+            self.avg_gain, self.avg_loss = gain, loss
+        else:
+            w = 1 / self.rsi_window
+            self.avg_gain = (1 - w) * self.avg_gain + w * gain
+            self.avg_loss = (1 - w) * self.avg_loss + w * loss
+
+        self.prev_close, self.last_close = self.last_close, close
+        self.count += 1
+        if timestamp is not None:
+            self.as_of = pd.Timestamp(timestamp).isoformat()
+        return self
+
+    def advance(self, closes):
+        """เพิ่มหลายแท่งจาก Series (ข้ามแท่งที่ไม่ใหม่กว่า as_of)"""
+        if self.as_of is not None:
+            closes = closes.loc[closes.index > pd.Timestamp(self.as_of)]
+        for timestamp, close in closes.items():
+            self.update(close, timestamp)
+        return self
+
+    def peek(self, close):
+        """ค่าตัวชี้วัดถ้าเพิ่มแท่งนี้ (เช่นแท่งที่ยังไม่ปิด) โดยไม่เปลี่ยนสถานะ"""
+        return copy.deepcopy(self).update(close).values()
+
+    @property
+    def ema(self):
+        return self.ema_num / self.ema_den if self.ema_den else math.nan
+
+    @property
+    def rsi(self):
+        if self.count < self.rsi_window:
+            return math.nan
+        if self.rsi_method == "sma":
+            avg_gain = sum(self.gains) / self.rsi_window
+            avg_loss = sum(self.losses) / self.rsi_window
+        else:
+            avg_gain, avg_loss = self.avg_gain, self.avg_loss
+        if avg_loss == 0:
+            return math.nan if avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    @property
+    def change(self):
+        if not self.prev_close:
+            return math.nan
+        return (self.last_close - self.prev_close) / self.prev_close * 100
+
+    def values(self):
+        return {"price": self.last_close, "rsi": self.rsi, "ema": self.ema, "change": self.change}
+
+    def to_dict(self):
+        state = {k: v for k, v in vars(self).items() if k not in ("gains", "losses")}
+        state["gains"], state["losses"] = list(self.gains), list(self.losses)
+        return state
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data["rsi_window"], data["ema_span"], data["rsi_method"])
+        for key, value in data.items():
+            if key not in ("gains", "losses"):
+                setattr(state, key, value)
+        state.gains.extend(data["gains"])
+        state.losses.extend(data["losses"])
+        return state
+
+
+def save_states(path, states):
+    """บันทึกสถานะของทุกหุ้นเป็น JSON (เขียนไฟล์ชั่วคราวแล้ว rename ทับ)"""
+    atomic_write_text(path, json.dumps({ticker: state.to_dict() for ticker, state in states.items()}))
+
+
+def load_states(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {ticker: StreamingIndicators.from_dict(state) for ticker, state in data.items()}
@@ -0,0 +1,92 @@
+"""โหมด Live: poll แท่ง 1 นาทีของหุ้นที่มีคนเปิดดูอยู่ใน background แล้วคำนวณ RSI/EMA จากราคาล่าสุดแบบ O(1)"""
+import logging
+import threading
+import time
+
+import pandas as pd
+
+from indicators import StreamingIndicators
+from market_data import PriceBatch, YahooPriceSource
+
+logger = logging.getLogger(__name__)
+
+
+class LivePoller:
+    """ดึงราคาวันนี้ (interval 1 นาที) ของหุ้นที่ถูก watch ทุก interval วินาทีใน thread เดียวต่อ process
+
+    หุ้นที่ไม่มี session ไหน watch เกิน idle_timeout วินาทีจะถูกเลิก poll
+    """
+
+    def __init__(self, source=None, interval=60, idle_timeout=300):
+        self.source = source or YahooPriceSource()
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self._watched = {}
+        self._quotes = {}
+        self._states = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, tickers):
+        """บอกว่ามีคนกำลังดูหุ้นเหล่านี้ (เริ่ม thread ครั้งแรกที่เรียก)"""
+        now = time.time()
+        with self._lock:
+            for ticker in tickers:
+                self._watched[ticker] = now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-poller", daemon=True)
+                self._thread.start()
+
+    def active_tickers(self):
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            return sorted(ticker for ticker, seen in self._watched.items() if seen >= cutoff)
+
+    def poll_once(self):
+        """ดึงแท่ง 1 นาทีของวันนี้ของหุ้นที่ active ในคำขอเดียว แล้วเก็บราคาล่าสุด"""
+        tickers = self.active_tickers()
+        if not tickers:
+            return {}
+        batch = PriceBatch(self.source.download(tickers, period="1d", interval="1m"))
+        updated = {}
+        for ticker in tickers:
+            closes = batch.history(ticker).get("Close", pd.Series(dtype=float)).dropna()
+            if len(closes):
+                updated[ticker] = (closes.index[-1], float(closes.iloc[-1]))
+        with self._lock:
+            self._quotes.update(updated)
+        return updated
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("poll ราคา live ไม่สำเร็จ")
+            time.sleep(self.interval)
+
+    def quote(self, ticker):
+        """(timestamp, ราคา) ล่าสุดของหุ้น หรือ None ถ้ายังไม่มี"""
+        with self._lock:
+            return self._quotes.get(ticker)
+
+    def indicators(self, ticker, closed_bars):
+        """ค่า price/rsi/ema/change ณ ราคาล่าสุด
+
+        สถานะ RSI/EMA ของแท่งรายวันที่ปิดแล้วเก็บไว้ต่อหุ้นและเลื่อนเฉพาะแท่งใหม่
+        แล้วใช้ peek() กับราคา live แทนแท่งของวันนี้ที่ยังไม่ปิด
+        ถ้าแท่งแรกของ closed_bars เปลี่ยน (ช่วงเวลาเลื่อนไป) จะสร้างสถานะใหม่ ให้ EMA ใช้ช่วงเดียวกับ snapshot ปกติ
+        """
+        quote = self.quote(ticker)
+        if quote is None:
+            return None
+        # แท่งของวันเดียวกับราคา live ยังไม่ปิด → ไม่นับรวมในสถานะ
+        closed_bars = closed_bars.loc[closed_bars.index < pd.Timestamp(quote[0]).normalize()]
+        first_bar = closed_bars.index[0] if len(closed_bars) else None
+        with self._lock:
+            start, state = self._states.get(ticker, (None, None))
+            if state is None or start != first_bar:
+                state = StreamingIndicators()
+                self._states[ticker] = (first_bar, state)
+            state.advance(closed_bars)
+            return dict(state.peek(quote[1]), as_of=quote[0])
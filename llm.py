@@ -0,0 +1,295 @@
+"""วิเคราะห์ข่าวด้วย LLM: สร้าง prompt, เรียกแบบ streaming และวิเคราะห์หลายข่าวพร้อมกัน"""
+import hashlib
+import json
+import queue
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+
+MODEL = "gpt-3.5-turbo"  # ใช้ gpt-3.5-turbo ประหยัดกว่า
+PROMPT_VERSION = 1  # เพิ่มเลขนี้เมื่อแก้ prompt เพื่อไม่ให้ใช้ผลวิเคราะห์จาก prompt เก่า
+
+FALLBACK_ANALYSIS = """
+        **สรุป:** ข่าวเกี่ยวกับการเคลื่อนไหวของหุ้น
+        
+        **ผลกระทบ:** เป็นกลาง - ต้องติดตามความคืบหน้าต่อไป
+        
+        **คำแนะนำ:** ศึกษาข้อมูลเพิ่มเติมก่อนตัดสินใจลงทุน
+        """
+
+
+def build_prompt(article):
+    return f"""
+        วิเคราะห์บทความข่าวหุ้นนี้:
+        หัวข้อ: "{article['title']}"
+        เนื้อหา: {article['description']}
+
+        กรุณาตอบเป็นภาษาไทยในรูปแบบ:
+        
+        **สรุป:** [สรุปประเด็นสำคัญใน 1-2 ประโยค]
+        
+        **ผลกระทบ:** [บวก/ลบ/เป็นกลาง] - [เหตุผลสั้นๆ]
+        
+        **คำแนะนำ:** [ข้อเสนอแนะสำหรับนักลงทุน]
+        """
+
+
+BATCH_MARKER = "ตอบเป็น JSON เท่านั้น"
+
+
+def build_batch_prompt(articles):
+    """prompt เดียวสำหรับหลายข่าว ขอคำตอบเป็น JSON แยกตาม id ของข่าว"""
+    items = "\n        ".join(
+        f'[{i}] หัวข้อ: "{article["title"]}" เนื้อหา: {article["description"]}'
+        for i, article in enumerate(articles, 1)
+    )
+    return f"""
+        วิเคราะห์บทความข่าวหุ้นต่อไปนี้ทีละข่าว:
+        {items}
+
+        กรุณาตอบเป็นภาษาไทย {BATCH_MARKER} ตามรูปแบบ:
+        {{"results": [{{"id": <เลขข่าว>, "summary": "<สรุปประเด็นสำคัญใน 1-2 ประโยค>",
+        "impact": "<บวก/ลบ/เป็นกลาง> - <เหตุผลสั้นๆ>", "recommendation": "<ข้อเสนอแนะสำหรับนักลงทุน>"}}]}}
+        ต้องมีผลครบทุกข่าว {len(articles)} ข่าว
+        """
+
+
+def format_analysis(record):
+    """แปลงผลแบบ JSON ให้อยู่ในรูปแบบข้อความเดียวกับการวิเคราะห์ทีละข่าว"""
+    return (
+        f"**สรุป:** {record['summary']}\n\n"
+        f"**ผลกระทบ:** {record['impact']}\n\n"
+        f"**คำแนะนำ:** {record['recommendation']}"
+    )
+
+
+def parse_batch_response(text, count):
+    """แยกคำตอบ JSON กลับเป็นผลวิเคราะห์รายข่าวตามลำดับ id (ไม่ครบหรือผิดรูปแบบ → ValueError)"""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("ไม่พบ JSON ในคำตอบ")
+    records = json.loads(text[start:end + 1]).get("results")
+    if not isinstance(records, list):
+        raise ValueError("คำตอบไม่มี results")
+    by_id = {}
+    for record in records:
+        if not all(isinstance(record.get(field), str) and record[field].strip() for field in ("summary", "impact", "recommendation")):
+            raise ValueError(f"ผลของข่าว {record.get('id')} ไม่ครบ")
+        by_id[int(record["id"])] = format_analysis(record)
+    missing = [i for i in range(1, count + 1) if i not in by_id]
+    if missing:
+        raise ValueError(f"ไม่มีผลของข่าว {missing}")
+    return [by_id[i] for i in range(1, count + 1)]
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def analysis_key(article, model=MODEL, prompt_version=PROMPT_VERSION):
+    """hash ของเนื้อหาข่าว (หัวข้อ+เนื้อหาที่ normalize แล้ว) + เวอร์ชัน prompt + model
+
+    ไม่รวม url/publishedAt/ticker ข่าวเดียวกันที่เห็นจากหุ้นต่างตัว ต่าง session หรือหลัง restart จึงได้ key เดียวกัน
+    """
+    content = "\x1f".join([_normalize(article.get("title")), _normalize(article.get("description")), str(prompt_version), model])
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class OpenAIChatClient:
+    """เรียก openai.ChatCompletion ทั้งแบบรอคำตอบเต็มและแบบ streaming
+
+    import openai ตอนเรียกครั้งแรก (ใช้เวลาราว 0.7 วินาที) หน้าที่ผลวิเคราะห์อยู่ในแคชหมดแล้วจึงไม่ต้องจ่ายส่วนนี้
+    """
+
+    def __init__(self, model=MODEL, temperature=0.3, max_tokens=300, api_key=None):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.api_key = api_key
+
+    def _create(self, prompt, max_tokens=None, **kwargs):
+        import openai
+
+        if self.api_key is not None:
+            openai.api_key = self.api_key
+        return openai.ChatCompletion.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            max_tokens=max_tokens or self.max_tokens,
+            **kwargs
+        )
+
+    def complete(self, prompt, max_tokens=None):
+        with telemetry.timed("openai", call="complete"):
+            response = self._create(prompt, max_tokens=max_tokens)
+        return response.choices[0].message.content.strip()
+
+    def stream(self, prompt):
+        """yield ข้อความทีละส่วนตามที่ API ส่งมา (จับเวลาตั้งแต่ส่งคำขอจนได้ส่วนสุดท้าย)"""
+        with telemetry.timed("openai", call="stream"):
+            for chunk in self._create(prompt, stream=True):
+                text = chunk["choices"][0]["delta"].get("content")
+                if text:
+                    yield text
+
+
+class FakeLLM:
+    """LLM จำลองสำหรับทดสอบออฟไลน์: หน่วงเวลาตาม latency แล้วส่งคำตอบทีละคำ
+
+    responder รับ prompt แล้วคืนข้อความ (ค่าเริ่มต้นคืน response คงที่)
+    """
+
+    model = "fake-llm"
+
+    def __init__(self, response=None, latency=0.5, chunk_delay=0.01, responder=None):
+        self.response = response or FALLBACK_ANALYSIS.strip()
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.responder = responder
+        self.calls = 0
+
+    def _respond(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.responder:
+            return self.responder(prompt)
+        if BATCH_MARKER in prompt:
+            # prompt แบบ batch → ตอบ JSON ครบตามจำนวนข่าว
+            count = len(re.findall(r"^\s*\[\d+\] หัวข้อ:", prompt, flags=re.MULTILINE))
+            record = {"summary": "ข่าวเกี่ยวกับการเคลื่อนไหวของหุ้น", "impact": "เป็นกลาง - ต้องติดตามความคืบหน้าต่อไป",
+                      "recommendation": "ศึกษาข้อมูลเพิ่มเติมก่อนตัดสินใจลงทุน"}
+            return json.dumps({"results": [dict(record, id=i) for i in range(1, count + 1)]}, ensure_ascii=False)
+        return self.response
+
+    def complete(self, prompt, max_tokens=None):
+        with telemetry.timed(self.model, call="complete"):
+            return self._respond(prompt).strip()
+
+    def stream(self, prompt):
+        with telemetry.timed(self.model, call="stream"):
+            for word in self._respond(prompt).split(" "):
+                time.sleep(self.chunk_delay)
+                yield word + " "
+
+
+def analyze_article(article, client, cache=None):
+    """วิเคราะห์ข่าวหนึ่งข่าว (ใช้ผลในแคชถ้ามี) ถ้าเรียกไม่สำเร็จคืนผลวิเคราะห์สำรอง"""
+    key = analysis_key(article, model=client.model)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    try:
+        analysis = client.complete(build_prompt(article))
+    except Exception:
+        telemetry.fallback("analysis", reason="llm_error")
+        return FALLBACK_ANALYSIS
+    if cache is not None:
+        cache.set(key, analysis)
+    return analysis
+
+
+def stream_analyses(articles, client, cache=None, max_workers=4, idle_timeout=120):
+    """วิเคราะห์หลายข่าวพร้อมกันใน thread pool แล้ว yield (index, ข้อความถึงตอนนี้, เสร็จแล้วหรือยัง)
+
+    ลำดับของ event เป็นไปตามที่ข้อความมาถึงจริง ไม่ใช่ลำดับข่าว ผู้เรียกจึงแสดงผลแต่ละข่าวได้ทันที
+    ถ้าไม่มี event ใหม่เลยนาน idle_timeout วินาที ข่าวที่ยังไม่เสร็จจะได้ผลวิเคราะห์สำรองแทน (หน้าไม่ค้าง)
+    """
+    events = queue.Queue()
+    pending = []
+
+    def worker(index, article, key):
+        parts = []
+        try:
+            for part in client.stream(build_prompt(article)):
+                parts.append(part)
+                events.put((index, "".join(parts), False))
+            analysis = "".join(parts).strip()
+            if not analysis:
+                raise ValueError("empty response")
+        except Exception:
+            telemetry.fallback("analysis", reason="llm_error")
+            events.put((index, FALLBACK_ANALYSIS, True))
+            return
+        try:
+            if cache is not None:
+                cache.set(key, analysis)
+        except Exception:
+            # เขียนแคชไม่สำเร็จ (เช่น database is locked) ยังแสดงผลได้ แค่ครั้งหน้าต้องวิเคราะห์ใหม่
+            telemetry.count("cache_errors_total", cache="analysis")
+        finally:
+            events.put((index, analysis, True))
+
+    for index, article in enumerate(articles):
+        key = analysis_key(article, model=client.model)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            yield index, cached, True
+        else:
+            pending.append((index, article, key))
+
+    if not pending:
+        return
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(pending)))
+    try:
+        for job in pending:
+            executor.submit(worker, *job)
+        remaining = {index for index, _, _ in pending}
+        while remaining:
+            try:
+                index, text, done = events.get(timeout=idle_timeout)
+            except queue.Empty:
+                telemetry.fallback("analysis", reason="timeout")
+                for index in sorted(remaining):
+                    yield index, FALLBACK_ANALYSIS, True
+                return
+            if done:
+                remaining.discard(index)
+            yield index, text, done
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def analyze_batch(articles, client, cache=None, max_batch_size=8):
+    """วิเคราะห์หลายข่าว (ของหุ้นเดียวหรือคิวข้ามหุ้น) ด้วยคำขอเดียวต่อ max_batch_size ข่าว
+
+    คืนผลตามลำดับ articles ในรูปแบบเดียวกับ analyze_article ถ้าแยก JSON ไม่ได้จะถอยไปเรียกทีละข่าว
+    ข่าวเดียวกันที่มาซ้ำ (เช่นข่าวที่ติดหลายหุ้นในคิวของ pipeline) ส่งให้ LLM ครั้งเดียวแล้วใช้ผลร่วมกัน
+    """
+    results = [None] * len(articles)
+    pending = {}  # key → (ข่าว, [index ทั้งหมดที่เป็นข่าวนี้]) เรียงตามลำดับที่พบครั้งแรก
+    for index, article in enumerate(articles):
+        key = analysis_key(article, model=client.model)
+        if key in pending:
+            pending[key][1].append(index)
+            continue
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            results[index] = cached
+        else:
+            pending[key] = (article, [index])
+
+    pending = list(pending.items())
+    for start in range(0, len(pending), max_batch_size):
+        chunk = pending[start:start + max_batch_size]
+        chunk_articles = [article for _, (article, _) in chunk]
+        try:
+            # งบ token ต่อข่าวเท่ากับการเรียกทีละข่าว
+            text = client.complete(build_batch_prompt(chunk_articles), max_tokens=300 * len(chunk))
+            analyses = parse_batch_response(text, len(chunk))
+        except Exception:
+            telemetry.fallback("analysis_batch")
+            analyses = [analyze_article(article, client, cache=cache) for _, (article, _) in chunk]
+        else:
+            if cache is not None:
+                for (key, _), analysis in zip(chunk, analyses):
+                    cache.set(key, analysis)
+        for (_, (_, indexes)), analysis in zip(chunk, analyses):
+            for index in indexes:
+                results[index] = analysis
+    return results
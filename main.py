@@ -1,296 +1,55 @@
 import streamlit as st
-import requests
 import datetime
-import pandas as pd
-import openai
-from newsapi import NewsApiClient
+import threading
 import time
-import yfinance as yf
 
-# ========== Configs ==========
-openai.api_key = st.secrets["OPENAI_API_KEY"]
-newsapi = NewsApiClient(api_key=st.secrets["NEWS_API_KEY"])
-
-PORT_STOCKS = ["ABBV", "PFE", "NVDA", "O", "MSFT", "TSM", "RKLB", "GOOGL", "RXRX"]  # Portfolio
-WATCHLIST = ["AMZN", "ARM", "ASML", "JEPQ"]  # Watchlist
-ALL_TICKERS = list(set(PORT_STOCKS + WATCHLIST))
+import core
+import telemetry
+from config import (
+    ALL_TICKERS,
+    DEBUG_PANEL,
+    INDICATOR_SNAPSHOT_TTL,
+    LIVE_POLL_SECONDS,
+    LLM_BATCH_MODE,
+    NEWSAPI_DAILY_BUDGET,
+    PRECOMPUTED_ONLY,
+    TICKER_REGISTRY,
+)
+from core import get_analysis_cache, get_llm_client, get_news_cache, get_news_limiter
+from llm import analyze_batch, stream_analyses
+from signals import build_screener, ema_recommendation, rsi_recommendation
 
 # ========== Utility Functions ==========
-@st.cache_data(ttl=300)  # Cache 5 นาที
+def streamlit_notify(level, message):
+    """แสดงข้อความสถานะจาก core ด้วย st.info/st.success/st.warning/st.error"""
+    getattr(st, level)(message)
+
+# st.cache_data ไม่บอกว่า hit หรือ miss → ตั้ง flag ในฟังก์ชันที่ถูกแคช (รันเฉพาะตอน miss) แยกตาม thread ของ session
+_snapshot_computed = threading.local()
+
+@st.cache_data(ttl=INDICATOR_SNAPSHOT_TTL)  # Cache 5 นาที
+def _cached_indicator_snapshot(tickers):
+    _snapshot_computed.value = True
+    # st.cache_data แคชให้แล้ว ไม่ต้องใช้แคชใน core ซ้ำ (ปุ่มรีเฟรชล้างที่นี่ที่เดียว)
+    return core.get_indicator_snapshot(tickers, refresh=not PRECOMPUTED_ONLY, notify=streamlit_notify, max_age=0)
+
+def get_indicator_snapshot(tickers):
+    """คำนวณ RSI/EMA/% เปลี่ยนแปลง ของทุกหุ้นพร้อมกันจากเมทริกซ์ราคา"""
+    _snapshot_computed.value = False
+    snapshot = _cached_indicator_snapshot(tickers)
+    telemetry.cache("st_indicator_snapshot", hit=not _snapshot_computed.value)
+    return snapshot
+
 def get_stock_price_and_indicators(ticker):
-    """ดึงราคาหุ้นจริงผ่าน Yahoo Finance"""
-    try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period="30d")  # ข้อมูล 30 วัน
-        
-        if hist.empty:
-            raise Exception(f"ไม่พบข้อมูลสำหรับ {ticker}")
-            
-        current_price = hist['Close'].iloc[-1]
-        
-        # คำนวณ RSI
-        closes = hist['Close']
-        delta = closes.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs)).iloc[-1]
-        
-        # คำนวณ EMA 20 วัน
-        ema = closes.ewm(span=20).mean().iloc[-1]
-        
-        return {
-            "price": round(current_price, 2),
-            "rsi": round(rsi, 2),
-            "ema": round(ema, 2),
-            "change": round(((current_price - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100, 2)
-        }
-    except Exception as e:
-        st.error(f"❌ ไม่สามารถดึงข้อมูลราคาหุ้น {ticker}: {str(e)}")
-        # ใช้ข้อมูล Mock เป็น fallback
-        return {
-            "price": round(100 + hash(ticker) % 100, 2),
-            "rsi": 30 + hash(ticker + "rsi") % 40,
-            "ema": round(95 + hash(ticker + "ema") % 10, 2),
-            "change": round(-5 + hash(ticker + "change") % 10, 2)
-        }
+    """ดึงราคาหุ้นจริงผ่าน Yahoo Finance (อ่านจากผลคำนวณ batch ของทุกหุ้น)"""
+    snapshot = get_indicator_snapshot(tuple(sorted(ALL_TICKERS)))
+    return core.stock_data_from_snapshot(snapshot, ticker, notify=streamlit_notify)
 
 def get_news_for_ticker(ticker):
-    """ดึงข่าวพร้อม Rate Limiting Protection และ Multiple Sources"""
-    
-    # ✅ ใช้ session_state cache เพื่อลดการเรียกซ้ำ (Cache นาน 6 ชั่วโมง)
-    cache_key = f"news_cache_{ticker}_{datetime.datetime.now().strftime('%Y%m%d_%H')}"
-    six_hour_cache_key = f"news_cache_6h_{ticker}_{datetime.datetime.now().strftime('%Y%m%d_%H')}".replace(f'_{datetime.datetime.now().hour}', f'_{datetime.datetime.now().hour // 6 * 6}')
-    
-    # ตรวจสอบ cache 6 ชั่วโมงก่อน
-    if six_hour_cache_key in st.session_state:
-        st.info("📋 ใช้ข้อมูลข่าวจาก Cache เพื่อประหยัด API Quota")
-        return st.session_state[six_hour_cache_key]
-    
-    if cache_key in st.session_state:
-        return st.session_state[cache_key]
-
-    # ตรวจสอบ API Quota
-    quota_key = f"api_quota_{datetime.datetime.now().strftime('%Y%m%d')}"
-    if quota_key not in st.session_state:
-        st.session_state[quota_key] = 0
-    
-    if st.session_state[quota_key] >= 80:  # จำกัดที่ 80 requests/day
-        st.warning("⚠️ API Quota ใกล้หมดแล้ว ใช้ข้อมูล Alternative Sources")
-        return get_alternative_news(ticker)
-
-    # ตรวจสอบ Rate Limiting
-    last_request_key = "last_news_request"
-    if last_request_key in st.session_state:
-        time_since_last = time.time() - st.session_state[last_request_key]
-        if time_since_last < 15:  # รอ 15 วินาที
-            st.warning(f"⏳ รอ {15-int(time_since_last)} วินาที เพื่อป้องกัน Rate Limit")
-            return get_alternative_news(ticker)
-
-    # ลองเรียก API
-    try:
-        query_map = {
-            # Portfolio stocks
-            "ABBV": "AbbVie pharmaceutical",
-            "PFE": "Pfizer pharmaceutical", 
-            "NVDA": "Nvidia",
-            "O": "Realty Income REIT",
-            "MSFT": "Microsoft",
-            "TSM": "Taiwan Semiconductor",
-            "RKLB": "Rocket Lab",
-            "GOOGL": "Google Alphabet",
-            "RXRX": "Recursion Pharmaceuticals",
-            # Watchlist stocks
-            "AMZN": "Amazon",
-            "ARM": "ARM Holdings",
-            "ASML": "ASML semiconductor",
-            "JEPQ": "JPMorgan ETF"
-        }
-        query_term = query_map.get(ticker, ticker)
-
-        st.session_state[last_request_key] = time.time()
-        st.session_state[quota_key] += 1
-        
-        # ใช้ get_top_headlines แทน get_everything (ใช้ quota น้อยกว่า)
-        articles = newsapi.get_top_headlines(
-            q=query_term,
-            language="en",
-            category="business",
-            page_size=6
-        )
-        
-        if articles["status"] == "ok" and articles.get("articles"):
-            filtered_articles = [art for art in articles["articles"] if art.get("title") and art.get("description")][:4]
-            st.session_state[six_hour_cache_key] = filtered_articles  # Cache นาน 6 ชั่วโมง
-            st.success(f"✅ ดึงข่าวสำเร็จ ({len(filtered_articles)} ข่าว) - API Quota เหลือ: {100-st.session_state[quota_key]}")
-            return filtered_articles
-        else:
-            raise Exception("No articles found")
-            
-    except Exception as e:
-        st.error(f"❌ News API ไม่สำเร็จ: {str(e)}")
-        return get_alternative_news(ticker)
-
-def get_alternative_news(ticker):
-    """ข่าวจากแหล่งอื่นเมื่อ News API หมด"""
-    
-    # เพิ่ม company_map ที่ global level เพื่อให้ selectbox ใช้ได้
-    company_map = {
-        # Portfolio
-        "ABBV": {"name": "AbbVie", "sector": "Healthcare/Pharma"},
-        "PFE": {"name": "Pfizer", "sector": "Healthcare/Pharma"},
-        "NVDA": {"name": "Nvidia", "sector": "Technology/AI"},
-        "O": {"name": "Realty Income", "sector": "REIT/Real Estate"},
-        "MSFT": {"name": "Microsoft", "sector": "Technology"},
-        "TSM": {"name": "Taiwan Semiconductor", "sector": "Technology/Semiconductor"},
-        "RKLB": {"name": "Rocket Lab", "sector": "Aerospace/Space"},
-        "GOOGL": {"name": "Google/Alphabet", "sector": "Technology"},
-        "RXRX": {"name": "Recursion Pharmaceuticals", "sector": "Biotech/AI"},
-        # Watchlist
-        "AMZN": {"name": "Amazon", "sector": "E-commerce/Cloud"},
-        "ARM": {"name": "ARM Holdings", "sector": "Semiconductor/IP"},
-        "ASML": {"name": "ASML", "sector": "Semiconductor Equipment"},
-        "JEPQ": {"name": "JPMorgan Equity Premium Income ETF", "sector": "ETF/Income"}
-    }
-    
-    company_info = company_map.get(ticker, {"name": ticker, "sector": "General"})
-    
-    # ข่าวตัวอย่างที่มีเนื้อหาดี แบ่งตาม sector
-    if "Pharma" in company_info["sector"] or "Healthcare" in company_info["sector"]:
-        sector_context = "อุตสาหกรรมยาและการแพทย์"
-        sector_trend = "การพัฒนายาใหม่และการอนุมัติจาก FDA"
-    elif "Technology" in company_info["sector"] or "AI" in company_info["sector"]:
-        sector_context = "เทคโนโลยีและ AI"
-        sector_trend = "นวัตกรรม AI และการแข่งขันในตลาดเทค"
-    elif "Semiconductor" in company_info["sector"]:
-        sector_context = "อุตสาหกรรมเซมิคอนดักเตอร์"
-        sector_trend = "ความต้องการชิปและสงครามการค้า"
-    elif "REIT" in company_info["sector"]:
-        sector_context = "อสังหาริมทรัพย์และ REIT"
-        sector_trend = "อัตราดอกเบี้ยและตลาดอสังหาฯ"
-    elif "ETF" in company_info["sector"]:
-        sector_context = "กองทุน ETF"
-        sector_trend = "กลยุทธ์การลงทุนและการจ่ายเงินปันผล"
-    else:
-        sector_context = "ตลาดหุ้นโดยรวม"
-        sector_trend = "แนวโน้มเศรษฐกิจโลก"
-    
-    # ข่าวตัวอย่างที่มีเนื้อหาดี
-    alternative_news = [
-        {
-            "title": f"📊 {company_info['name']} ({ticker}) - การวิเคราะห์ล่าสุดจากผู้เชี่ยวชาญ",
-            "description": f"นักวิเคราะห์ให้ความเห็นเกี่ยวกับแนวโน้มของ {company_info['name']} ในไตรมาสนี้ โดยมองว่าปัจจัยทางเศรษฐกิจและนวัตกรรมใหม่จะส่งผลต่อการเติบโต",
-            "url": f"https://finance.yahoo.com/quote/{ticker}/news",
-            "publishedAt": datetime.datetime.now().isoformat(),
-            "source": "Yahoo Finance"
-        },
-        {
-            "title": f"💼 {company_info['name']} เปิดเผยแผนยุทธศาสตร์ใหม่",
-            "description": f"ข้อมูลล่าสุดจาก {company_info['name']} เกี่ยวกับการขยายตลาดและการลงทุนในเทคโนโลยีใหม่ ซึ่งอาจส่งผลกระทบต่อมูลค่าหุ้นในระยะยาว",
-            "url": f"https://finance.yahoo.com/quote/{ticker}",
-            "publishedAt": (datetime.datetime.now() - datetime.timedelta(hours=2)).isoformat(),
-            "source": "Market Analysis"
-        },
-        {
-            "title": f"📈 {ticker} ผลประกอบการและแนวโน้มตลาด",
-            "description": f"การวิเคราะห์ผลการดำเนินงานของ {company_info['name']} พร้อมคาดการณ์แนวโน้มราคาหุ้นจากการเปลี่ยนแปลงของตลาดโลก",
-            "url": f"https://finance.yahoo.com/quote/{ticker}/analysis",
-            "publishedAt": (datetime.datetime.now() - datetime.timedelta(hours=4)).isoformat(),
-            "source": "Financial Analysis"
-        },
-        {
-            "title": f"🌐 ปัจจัยภายนอกที่ส่งผลต่อ {company_info['name']}",
-            "description": f"การวิเคราะห์ปัจจัยต่างๆ ที่อาจส่งผลกระทบต่อ {company_info['name']} เช่น นโยบายรัฐบาล การแข่งขัน และเทรนด์อุตสาหกรรม",
-            "url": f"https://finance.yahoo.com/quote/{ticker}/profile",
-            "publishedAt": (datetime.datetime.now() - datetime.timedelta(hours=6)).isoformat(),
-            "source": "Industry Report"
-        }
-    ]
-    
-    st.info("📰 ใช้ข้อมูลข่าวจาก Alternative Sources เนื่องจาก News API Quota หมด")
-    return alternative_news
-
-# เพิ่ม company_map ที่ global level เพื่อให้ selectbox ใช้ได้
-company_map = {
-    # Portfolio
-    "ABBV": {"name": "AbbVie", "sector": "Healthcare/Pharma"},
-    "PFE": {"name": "Pfizer", "sector": "Healthcare/Pharma"},
-    "NVDA": {"name": "Nvidia", "sector": "Technology/AI"},
-    "O": {"name": "Realty Income", "sector": "REIT/Real Estate"},
-    "MSFT": {"name": "Microsoft", "sector": "Technology"},
-    "TSM": {"name": "Taiwan Semiconductor", "sector": "Technology/Semiconductor"},
-    "RKLB": {"name": "Rocket Lab", "sector": "Aerospace/Space"},
-    "GOOGL": {"name": "Google/Alphabet", "sector": "Technology"},
-    "RXRX": {"name": "Recursion Pharmaceuticals", "sector": "Biotech/AI"},
-    # Watchlist
-    "AMZN": {"name": "Amazon", "sector": "E-commerce/Cloud"},
-    "ARM": {"name": "ARM Holdings", "sector": "Semiconductor/IP"},
-    "ASML": {"name": "ASML", "sector": "Semiconductor Equipment"},
-    "JEPQ": {"name": "JPMorgan Equity Premium Income ETF", "sector": "ETF/Income"}
-}
-
-@st.cache_data(ttl=3600)  # Cache 1 ชั่วโมง
-def analyze_sentiment_and_summarize(article):
-    """วิเคราะห์ความรู้สึกและสรุปข่าว"""
-    try:
-        prompt = f"""
-        วิเคราะห์บทความข่าวหุ้นนี้:
-        หัวข้อ: "{article['title']}"
-        เนื้อหา: {article['description']}
-
-        กรุณาตอบเป็นภาษาไทยในรูปแบบ:
-        
-        **สรุป:** [สรุปประเด็นสำคัญใน 1-2 ประโยค]
-        
-        **ผลกระทบ:** [บวก/ลบ/เป็นกลาง] - [เหตุผลสั้นๆ]
-        
-        **คำแนะนำ:** [ข้อเสนอแนะสำหรับนักลงทุน]
-        """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",  # ใช้ gpt-3.5-turbo ประหยัดกว่า
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=300
-        )
-        return response.choices[0].message.content.strip()
-        
-    except Exception as e:
-        # Fallback analysis
-        return f"""
-        **สรุป:** ข่าวเกี่ยวกับการเคลื่อนไหวของหุ้น
-        
-        **ผลกระทบ:** เป็นกลาง - ต้องติดตามความคืบหน้าต่อไป
-        
-        **คำแนะนำ:** ศึกษาข้อมูลเพิ่มเติมก่อนตัดสินใจลงทุน
-        """
-
-def rsi_recommendation(rsi):
-    if rsi < 30:
-        return "🟢 RSI ต่ำเกินไป → สัญญาณซื้อแข็งแกร่ง"
-    elif rsi > 70:
-        return "🔴 RSI สูงเกินไป → สัญญาณขายแข็งแกร่ง"
-    elif rsi < 40:
-        return "🟡 RSI ค่อนข้างต่ำ → อาจพิจารณาซื้อ"
-    elif rsi > 60:
-        return "🟡 RSI ค่อนข้างสูง → ระวังการปรับตัวลง"
-    else:
-        return "⚪ RSI ปกติ → ถือหรือรอจังหวะ"
-
-def ema_recommendation(price, ema):
-    diff_percent = ((price - ema) / ema * 100)
-    if diff_percent > 2:
-        return f"🟢 ราคาสูงกว่า EMA {diff_percent:.1f}% → เทรนด์ขาขึ้นแข็งแกร่ง"
-    elif diff_percent < -2:
-        return f"🔴 ราคาต่ำกว่า EMA {abs(diff_percent):.1f}% → เทรนด์ขาลงแข็งแกร่ง"
-    elif diff_percent > 0:
-        return f"🟡 ราคาสูงกว่า EMA {diff_percent:.1f}% → เทรนด์ขาขึ้นอ่อน"
-    elif diff_percent < 0:
-        return f"🟡 ราคาต่ำกว่า EMA {abs(diff_percent):.1f}% → เทรนด์ขาลงอ่อน"
-    else:
-        return "⚪ ราคาใกล้เคียง EMA → อาจรอแนวโน้ม"
+    return core.get_news_for_ticker(ticker, allow_fetch=not PRECOMPUTED_ONLY, notify=streamlit_notify)
 
 # ========== Streamlit Layout ==========
+page_started = time.perf_counter()
 st.set_page_config(page_title="📊 Stock News Dashboard", layout="wide")
 
 # Custom CSS
@@ -319,37 +78,42 @@ st.title("📈 Dashboard ข่าวหุ้น + ตัวชี้วัด
 st.markdown("*อัปเดตข้อมูลจาก Yahoo Finance และ Multiple News Sources*")
 
 # แสดง API Quota Status
-quota_key = f"api_quota_{datetime.datetime.now().strftime('%Y%m%d')}"
-current_quota = st.session_state.get(quota_key, 0)
-remaining_quota = max(0, 80 - current_quota)
+current_quota = get_news_limiter().used_today()
+remaining_quota = max(0, NEWSAPI_DAILY_BUDGET - current_quota)
 
 st.markdown(f"""
 <div class="quota-info">
-📊 <strong>News API Status:</strong> ใช้ไป {current_quota}/80 requests วันนี้ | เหลือ {remaining_quota} requests
+📊 <strong>News API Status:</strong> ใช้ไป {current_quota}/{NEWSAPI_DAILY_BUDGET} requests วันนี้ | เหลือ {remaining_quota} requests
 </div>
 """, unsafe_allow_html=True)
 
 ticker = st.selectbox("🎯 เลือกหุ้นในพอร์ตหรือ Watchlist:", ALL_TICKERS, index=0, 
-                     format_func=lambda x: f"{'📊 ' if x in PORT_STOCKS else '👁️ '}{x} - {company_map.get(x, {}).get('name', x)}")
+                     format_func=TICKER_REGISTRY.label)
 
 # Control buttons
 col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 2])
 with col_btn1:
     if st.button("🔄 รีเฟรชข้อมูล"):
-        st.cache_data.clear()
+        # ดึงเฉพาะแท่งราคาที่เปลี่ยนแล้วล้างเฉพาะแคชตัวชี้วัด (ข่าวและผลวิเคราะห์ยังอยู่)
+        if not PRECOMPUTED_ONLY:
+            try:
+                core.refresh_prices(ALL_TICKERS)
+            except Exception as e:
+                st.warning(f"⚠️ อัปเดตราคาไม่สำเร็จ: {str(e)}")
+        _cached_indicator_snapshot.clear()
         st.rerun()
 
 with col_btn2:
     if st.button("🗑️ ล้าง Cache ข่าว"):
         # ล้างเฉพาะ news cache
-        keys_to_remove = [k for k in st.session_state.keys() if 'news_cache' in k]
-        for key in keys_to_remove:
-            del st.session_state[key]
+        get_news_cache().clear()
         st.success("✅ ล้าง News Cache เรียบร้อย")
         st.rerun()
 
 with col_btn3:
     st.caption("💡 หากข่าวไม่อัปเดต ลอง 'ล้าง Cache ข่าว' เพื่อดึงข้อมูลใหม่")
+    batch_mode = st.toggle("📦 วิเคราะห์ข่าวแบบ Batch (รวมเป็นคำขอเดียว)", value=LLM_BATCH_MODE)
+    live_mode = st.toggle(f"⚡ Live ราคา (อัปเดตทุก {LIVE_POLL_SECONDS} วินาที)", value=False)
 
 with st.spinner("📡 กำลังดึงข้อมูลหุ้นและข่าว..."):
     stock_data = get_stock_price_and_indicators(ticker)
@@ -357,34 +121,57 @@ with st.spinner("📡 กำลังดึงข้อมูลหุ้นแ
 
 # ========== Display Section ==========
 
-# Price Section
-change_color = "positive" if stock_data['change'] >= 0 else "negative"
-change_symbol = "+" if stock_data['change'] >= 0 else ""
+def render_price_section(ticker, stock_data):
+    # Price Section
+    change_color = "positive" if stock_data['change'] >= 0 else "negative"
+    change_symbol = "+" if stock_data['change'] >= 0 else ""
 
-st.markdown(f"""
-<div class="metric-card">
-<h2>💰 {ticker} - ราคาปัจจุบัน: ${stock_data['price']}</h2>
-<p class="{change_color}">การเปลี่ยนแปลง: {change_symbol}{stock_data['change']}%</p>
-</div>
-""", unsafe_allow_html=True)
+    st.markdown(f"""
+    <div class="metric-card">
+    <h2>💰 {ticker} - ราคาปัจจุบัน: ${stock_data['price']}</h2>
+    <p class="{change_color}">การเปลี่ยนแปลง: {change_symbol}{stock_data['change']}%</p>
+    </div>
+    """, unsafe_allow_html=True)
 
-# Technical Indicators
-col1, col2 = st.columns(2)
+    # Technical Indicators
+    col1, col2 = st.columns(2)
 
-with col1:
-    st.metric("📊 RSI (14 วัน)", f"{stock_data['rsi']:.1f}", help="Relative Strength Index - ดัชนีความแข็งแรงของราคา")
-    st.info(rsi_recommendation(stock_data['rsi']))
+    with col1:
+        st.metric("📊 RSI (14 วัน)", f"{stock_data['rsi']:.1f}", help="Relative Strength Index - ดัชนีความแข็งแรงของราคา")
+        st.info(rsi_recommendation(stock_data['rsi']))
 
-with col2:
-    st.metric("📈 EMA (20 วัน)", f"${stock_data['ema']:.2f}", help="Exponential Moving Average - ค่าเฉลี่ยเคลื่อนที่แบบเอ็กซ์โปเนนเชียล")
-    st.info(ema_recommendation(stock_data['price'], stock_data['ema']))
+    with col2:
+        st.metric("📈 EMA (20 วัน)", f"${stock_data['ema']:.2f}", help="Exponential Moving Average - ค่าเฉลี่ยเคลื่อนที่แบบเอ็กซ์โปเนนเชียล")
+        st.info(ema_recommendation(stock_data['price'], stock_data['ema']))
+
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def render_live_price_section(ticker, stock_data):
+    """วาดเฉพาะส่วนราคา/ตัวชี้วัดใหม่ตามรอบ poll ส่วนอื่นของหน้า (ข่าว, ผลวิเคราะห์) ไม่ถูกรันซ้ำ"""
+    try:
+        live_data = core.get_live_stock_data(ticker)
+    except Exception as e:
+        live_data = None
+        st.warning(f"⚠️ ดึงราคา Live ไม่สำเร็จ: {str(e)}")
+    if live_data is None:
+        st.caption("⏳ ยังไม่มีราคา Live แสดงราคาล่าสุดจากคลังแทน")
+        render_price_section(ticker, stock_data)
+    else:
+        st.caption(f"⚡ ราคา Live ณ {live_data['as_of']:%H:%M}")
+        render_price_section(ticker, live_data)
+
+if live_mode:
+    render_live_price_section(ticker, stock_data)
+else:
+    render_price_section(ticker, stock_data)
 
 # News Analysis Section
 st.subheader("📰 ข่าวและการวิเคราะห์")
 
 if raw_news:
     with st.expander(f"📄 พบข่าวทั้งหมด {len(raw_news)} ข่าว", expanded=True):
-        for i, article in enumerate(raw_news[:4], 1):  # แสดง 4 ข่าวแรก
+        news_to_analyze = raw_news[:4]  # แสดง 4 ข่าวแรก
+        analysis_slots = []
+        for i, article in enumerate(news_to_analyze, 1):
             with st.container():
                 col_title, col_date = st.columns([3, 1])
                 
@@ -401,40 +188,116 @@ if raw_news:
                 if article.get('description'):
                     st.write(f"📝 {article['description'][:200]}...")
                 
-                # AI Analysis
-                with st.spinner(f"🤖 กำลังวิเคราะห์ข่าวที่ {i}..."):
-                    analysis = analyze_sentiment_and_summarize(article)
-                    st.markdown(f"**🎯 การวิเคราะห์:**\n{analysis}")
+                # AI Analysis (เติมผลภายหลังเมื่อวิเคราะห์เสร็จ)
+                slot = st.empty()
+                slot.caption(f"🤖 กำลังวิเคราะห์ข่าวที่ {i}...")
+                analysis_slots.append(slot)
                 
                 st.divider()
+
+        if PRECOMPUTED_ONLY:
+            # แสดงเฉพาะผลที่ pipeline วิเคราะห์ไว้แล้ว ไม่เรียก LLM ระหว่างโหลดหน้า
+            for slot, article in zip(analysis_slots, news_to_analyze):
+                analysis = core.get_cached_analysis(article)
+                slot.markdown(f"**🎯 การวิเคราะห์:**\n{analysis}" if analysis else "⏳ ยังไม่มีผลวิเคราะห์ รอ pipeline เตรียมข้อมูล")
+        elif batch_mode:
+            # ส่งทุกข่าวใน prompt เดียว (ถ้าแยกผลไม่ได้จะถอยไปวิเคราะห์ทีละข่าว)
+            with st.spinner("🤖 กำลังวิเคราะห์ข่าวทั้งหมดในคำขอเดียว..."):
+                analyses = analyze_batch(news_to_analyze, get_llm_client(), cache=get_analysis_cache())
+            for slot, analysis in zip(analysis_slots, analyses):
+                slot.markdown(f"**🎯 การวิเคราะห์:**\n{analysis}")
+        else:
+            # วิเคราะห์ทุกข่าวพร้อมกัน แล้วแสดงข้อความของแต่ละข่าวทันทีที่มาถึง
+            for index, analysis, done in stream_analyses(news_to_analyze, get_llm_client(), cache=get_analysis_cache()):
+                cursor = "" if done else " ▌"
+                analysis_slots[index].markdown(f"**🎯 การวิเคราะห์:**\n{analysis}{cursor}")
 else:
     st.warning("⚠️ ไม่พบข่าวสำหรับหุ้นนี้ในขณะนี้")
 
 # Summary Section
 st.subheader("📋 สรุปภาพรวม")
-col_summary1, col_summary2 = st.columns(2)
-
-with col_summary1:
-    st.markdown("### 📊 สถานะทางเทคนิค")
-    rsi_status = "เป็นกลาง"
-    if stock_data['rsi'] < 30: rsi_status = "ซื้อแรง"
-    elif stock_data['rsi'] > 70: rsi_status = "ขายแรง"
-    
-    ema_status = "เป็นกลาง" 
-    if stock_data['price'] > stock_data['ema']: ema_status = "เทรนด์บวก"
-    elif stock_data['price'] < stock_data['ema']: ema_status = "เทรนด์ลบ"
-    
-    st.write(f"- RSI: {rsi_status}")
-    st.write(f"- EMA: {ema_status}")
-
-with col_summary2:
-    st.markdown("### 📈 คำแนะนำการลงทุน")
-    if stock_data['rsi'] < 30 and stock_data['price'] > stock_data['ema']:
-        st.success("✅ สัญญาณซื้อ - RSI ต่ำและเทรนด์บวก")
-    elif stock_data['rsi'] > 70 and stock_data['price'] < stock_data['ema']:
-        st.error("❌ สัญญาณขาย - RSI สูงและเทรนด์ลบ")
+
+def render_summary_section(stock_data):
+    col_summary1, col_summary2 = st.columns(2)
+
+    with col_summary1:
+        st.markdown("### 📊 สถานะทางเทคนิค")
+        rsi_status = "เป็นกลาง"
+        if stock_data['rsi'] < 30: rsi_status = "ซื้อแรง"
+        elif stock_data['rsi'] > 70: rsi_status = "ขายแรง"
+
+        ema_status = "เป็นกลาง"
+        if stock_data['price'] > stock_data['ema']: ema_status = "เทรนด์บวก"
+        elif stock_data['price'] < stock_data['ema']: ema_status = "เทรนด์ลบ"
+
+        st.write(f"- RSI: {rsi_status}")
+        st.write(f"- EMA: {ema_status}")
+
+    with col_summary2:
+        st.markdown("### 📈 คำแนะนำการลงทุน")
+        if stock_data['rsi'] < 30 and stock_data['price'] > stock_data['ema']:
+            st.success("✅ สัญญาณซื้อ - RSI ต่ำและเทรนด์บวก")
+        elif stock_data['rsi'] > 70 and stock_data['price'] < stock_data['ema']:
+            st.error("❌ สัญญาณขาย - RSI สูงและเทรนด์ลบ")
+        else:
+            st.info("⏳ สัญญาณไม่ชัดเจน - ติดตามต่อไป")
+
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def render_live_summary_section(ticker, stock_data):
+    """สรุปจากราคา live รอบเดียวกับส่วนราคาด้านบน ไม่ให้สัญญาณขัดกับตัวชี้วัดที่แสดงอยู่"""
+    try:
+        live_data = core.get_live_stock_data(ticker)
+    except Exception:
+        live_data = None
+    if live_data is None:
+        st.caption("⏳ สรุปจากราคาล่าสุดในคลัง (ยังไม่มีราคา Live)")
+        render_summary_section(stock_data)
     else:
-        st.info("⏳ สัญญาณไม่ชัดเจน - ติดตามต่อไป")
+        st.caption(f"⚡ สรุปจากราคา Live ณ {live_data['as_of']:%H:%M}")
+        render_summary_section(live_data)
+
+if live_mode:
+    render_live_summary_section(ticker, stock_data)
+else:
+    render_summary_section(stock_data)
+
+# Screener Section
+st.subheader("🧮 Screener ทั้งพอร์ตและ Watchlist")
+extra_symbols = st.text_input("➕ เพิ่มหุ้นใน Screener (คั่นด้วยจุลภาค):", "")
+screener_tickers = set(ALL_TICKERS) | {s.strip().upper() for s in extra_symbols.split(",") if s.strip()}
+screener_snapshot = get_indicator_snapshot(tuple(sorted(screener_tickers)))
+st.dataframe(build_screener(screener_snapshot, portfolio=TICKER_REGISTRY.portfolio_set, watchlist=TICKER_REGISTRY.watchlist_set), use_container_width=True)
 
 st.markdown("---")
 st.caption("⚠️ ข้อมูลนี้เป็นเพียงการศึกษาเท่านั้น ไม่ใช่คำแนะนำการลงทุน กรุณาศึกษาข้อมูลเพิ่มเติมก่อนตัดสินใจลงทุน")
+
+# ========== Debug Panel ==========
+telemetry.observe("page_render_seconds", time.perf_counter() - page_started)
+
+if DEBUG_PANEL or st.query_params.get("debug") == "1":
+    stats = telemetry.snapshot()
+    with st.expander("🛠️ Debug: เวลา แคช และ fallback (สถิติของ process นี้)"):
+        st.markdown("**⏱️ เวลาที่ใช้ (วินาที)**")
+        st.dataframe([
+            {"metric": h["name"], **h["labels"], "count": h["count"], "mean": h["mean"], "p50": h["p50"], "p95": h["p95"], "p99": h["p99"]}
+            for h in stats["histograms"]
+        ], use_container_width=True)
+
+        st.markdown("**📦 Cache hit ratio**")
+        st.dataframe([{"cache": name, **entry} for name, entry in stats["cache_ratios"].items()], use_container_width=True)
+
+        st.markdown("**⚠️ คำขอ upstream / error / fallback**")
+        st.dataframe([
+            {"metric": c["name"], **c["labels"], "value": c["value"]}
+            for c in stats["counters"] if c["name"] != "cache_requests_total"
+        ], use_container_width=True)
+
+        st.markdown("**📊 โควตา**")
+        for g in stats["gauges"]:
+            st.write(f"- {g['name']}: {g['value']:.0f}")
+
+        col_json, col_prom = st.columns(2)
+        with col_json:
+            st.download_button("⬇️ JSON", telemetry.to_json(indent=2), file_name="metrics.json", mime="application/json")
+        with col_prom:
+            st.download_button("⬇️ Prometheus", telemetry.to_prometheus(), file_name="metrics.prom", mime="text/plain")
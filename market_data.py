@@ -0,0 +1,145 @@
+"""ชั้นดึงข้อมูลราคาแบบ batch: ดาวน์โหลด OHLCV ของหลายหุ้นในครั้งเดียว แล้วแบ่งให้รายตัว"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import telemetry
+
+OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+SYNTHETIC_START = "2010-01-04"
+
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 30, "3mo": 91, "6mo": 182, "1y": 365, "2y": 730, "5y": 1826, "10y": 3652}
+
+
+def period_to_days(period):
+    """แปลง period แบบ yfinance (เช่น "30d", "1y") เป็นจำนวนวัน"""
+    if period in PERIOD_DAYS:
+        return PERIOD_DAYS[period]
+    if period.endswith("d"):
+        return int(period[:-1])
+    raise ValueError(f"ไม่รองรับ period: {period}")
+
+
+def normalize_wide_frame(data, tickers):
+    """จัดรูป DataFrame ให้คอลัมน์เป็น MultiIndex (field, ticker) เสมอ"""
+    if data is None or data.empty:
+        columns = pd.MultiIndex.from_product([OHLCV_FIELDS, list(tickers)])
+        return pd.DataFrame(columns=columns, dtype=float)
+
+    if not isinstance(data.columns, pd.MultiIndex):
+        # yfinance รุ่นเก่าคืนคอลัมน์แบบชั้นเดียวเมื่อขอหุ้นตัวเดียว
+        data = pd.concat({tickers[0]: data}, axis=1).swaplevel(axis=1)
+    elif data.columns.get_level_values(0).isin(tickers).all():
+        # group_by="ticker" → สลับให้ field อยู่ชั้นแรก
+        data = data.swaplevel(axis=1)
+
+    fields = [f for f in OHLCV_FIELDS if f in data.columns.get_level_values(0)]
+    data = data.loc[:, fields]
+    data.index = pd.DatetimeIndex(data.index).tz_localize(None)
+    return data.dropna(how="all").sort_index()
+
+
+class YahooPriceSource:
+    """ดึงราคาจาก Yahoo Finance ด้วย yf.download ครั้งเดียวสำหรับทุกหุ้น (import yfinance ตอนดึงครั้งแรก)"""
+
+    def download(self, tickers, period="30d", interval="1d", start=None):
+        import yfinance as yf
+
+        tickers = list(tickers)
+        with telemetry.timed("yahoo", interval=interval):
+            data = yf.download(
+                tickers,
+                period=None if start is not None else period,
+                start=start,
+                interval=interval,
+                group_by="column",
+                auto_adjust=False,
+                threads=True,
+                progress=False,
+            )
+        if data is None or data.empty:
+            # yf.download ไม่ raise เมื่อดึงไม่สำเร็จ แต่คืน DataFrame ว่าง
+            telemetry.count("upstream_empty_total", service="yahoo")
+        return normalize_wide_frame(data, tickers)
+
+
+class LocalPriceSource:
+    """แหล่งข้อมูลจำลองสำหรับทดสอบแบบออฟไลน์
+
+    ถ้าส่ง frames (dict ของ ticker → DataFrame OHLCV) จะใช้ข้อมูลนั้น
+    ไม่เช่นนั้นจะสร้าง random walk ที่ซ้ำได้ทุกครั้งจาก seed และชื่อหุ้น
+    """
+
+    def __init__(self, frames=None, seed=0, end=None):
+        self.frames = frames or {}
+        self.seed = seed
+        self.end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize()
+        self.calls = 0
+
+    def _synthetic(self, ticker):
+        # เริ่มจากวันตั้งต้นคงที่ ราคาของแต่ละวันจึงเท่าเดิมไม่ว่า end จะเป็นวันไหน
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()) + self.seed)
+        index = pd.bdate_range(start=SYNTHETIC_START, end=self.end)
+        start_price = 20 + zlib.crc32(ticker.encode()) % 300
+        close = start_price * np.exp(np.cumsum(rng.normal(0, 0.02, len(index))))
+        open_ = close * (1 + rng.normal(0, 0.005, len(index)))
+        spread = np.abs(rng.normal(0, 0.01, len(index))) * close
+        return pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) + spread,
+            "Low": np.minimum(open_, close) - spread,
+            "Close": close,
+            "Volume": rng.integers(100_000, 5_000_000, len(index)).astype(float),
+        }, index=index)
+
+    def download(self, tickers, period="30d", interval="1d", start=None):
+        self.calls += 1
+        tickers = list(tickers)
+        days = period_to_days(period)
+        frames = {}
+        for ticker in tickers:
+            frame = self.frames.get(ticker)
+            if frame is None:
+                frame = self._synthetic(ticker)
+            frames[ticker] = frame
+        wide = pd.concat(frames, axis=1).swaplevel(axis=1) if frames else None
+        wide = normalize_wide_frame(wide, tickers)
+        if start is not None:
+            return wide.loc[wide.index >= pd.Timestamp(start)]
+        return wide.loc[wide.index > wide.index.max() - pd.Timedelta(days=days)] if len(wide) else wide
+
+
+class PriceBatch:
+    """ผลดาวน์โหลดแบบกว้าง (วันที่ × (field, ticker)) พร้อมตัวช่วยแบ่งรายหุ้น"""
+
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def tickers(self):
+        return list(self.data.columns.get_level_values(1).unique())
+
+    def field(self, name):
+        """เมทริกซ์ (วันที่ × ticker) ของ field เดียว เช่น Close"""
+        if name not in self.data.columns.get_level_values(0):
+            return pd.DataFrame(index=self.data.index, dtype=float)
+        return self.data[name]
+
+    def close_matrix(self):
+        return self.field("Close")
+
+    def history(self, ticker):
+        """คืน OHLCV ของหุ้นตัวเดียวในรูปแบบเดียวกับ yf.Ticker().history"""
+        if ticker not in self.tickers:
+            return pd.DataFrame(columns=OHLCV_FIELDS, dtype=float)
+        frame = self.data.xs(ticker, axis=1, level=1)
+        return frame.dropna(how="all")
+
+
+def fetch_price_batch(tickers, period="30d", interval="1d", source=None):
+    """ดาวน์โหลดราคาทุกหุ้นในคำขอเดียว"""
+    source = source or YahooPriceSource()
+    tickers = sorted(set(tickers))
+    return PriceBatch(source.download(tickers, period=period, interval=interval))
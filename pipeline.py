@@ -0,0 +1,97 @@
+"""เตรียมข้อมูลล่วงหน้าแบบไม่ต้องเปิด Streamlit: อัปเดตคลังราคา, แคชข่าว และแคชผลวิเคราะห์ของทุกหุ้น
+
+ตัวอย่าง:
+    python pipeline.py --once                 # รันรอบเดียว (เหมาะกับ cron)
+    python pipeline.py --interval 900         # รันซ้ำทุก 15 นาที
+    python pipeline.py --tickers NVDA MSFT --skip-analysis
+
+เมื่อรัน pipeline ตามรอบแล้ว ตั้ง INVEST_PRECOMPUTED_ONLY=1 ให้ dashboard อ่านแต่ผลที่เตรียมไว้
+"""
+import argparse
+import logging
+import time
+
+import core
+import telemetry
+from config import ALL_TICKERS, NEWSAPI_MIN_INTERVAL
+from fileutil import atomic_write_text
+from llm import analyze_batch
+
+logger = logging.getLogger("pipeline")
+
+
+def warm_prices(tickers):
+    """ดึงแท่งใหม่ของทุกหุ้นเข้าคลังราคาบนดิสก์ (ข้ามการจำกัดความถี่ของ dashboard)"""
+    fetched = core.get_price_store().sync(tickers)
+    logger.info("ราคา: อัปเดต %d หุ้น (%d แท่ง)", len(fetched), sum(len(bars) for bars in fetched.values()))
+    return fetched
+
+
+def warm_news(tickers, fetch=True):
+    """เติมแคชข่าว ข่าวที่ยังไม่หมดอายุจะไม่เรียก API ซ้ำ ส่วนคำขอใหม่รอคิว rate limiter ได้นานกว่าหน้าเว็บ
+
+    fetch=False อ่านจากแคชอย่างเดียว (ใช้ตอน --skip-news แต่ยังวิเคราะห์ข่าว)
+    """
+    news = {}
+    for ticker in tickers:
+        news[ticker] = core.get_news_for_ticker(ticker, allow_fetch=fetch, max_wait=NEWSAPI_MIN_INTERVAL * 2)
+    return news
+
+
+def warm_analyses(news, batch_size=8):
+    """วิเคราะห์ข่าวของทุกหุ้นรวมเป็นคิวเดียวแบบ batch (ข่าวที่มีผลในแคชแล้วจะถูกข้าม)"""
+    articles = [article for ticker_news in news.values() for article in ticker_news[:4]]
+    analyze_batch(articles, core.get_llm_client(), cache=core.get_analysis_cache(), max_batch_size=batch_size)
+    logger.info("วิเคราะห์ข่าว: %d ข่าว", len(articles))
+
+
+def run_once(tickers, prices=True, news=True, analyses=True, batch_size=8):
+    started = time.time()
+    if prices:
+        try:
+            warm_prices(tickers)
+        except Exception:
+            logger.exception("อัปเดตราคาไม่สำเร็จ")
+    if news or analyses:
+        ticker_news = warm_news(tickers, fetch=news)
+        if analyses:
+            warm_analyses(ticker_news, batch_size=batch_size)
+    logger.info("เสร็จใน %.1f วินาที", time.time() - started)
+
+
+def write_metrics(path):
+    """เขียนสถิติของ process ลงไฟล์ (เขียนไฟล์ชั่วคราวแล้ว rename ทับ ให้ textfile collector อ่านได้ไม่ขาดกลาง)"""
+    text = telemetry.to_json(indent=2) if path.endswith(".json") else telemetry.to_prometheus()
+    atomic_write_text(path, text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="เตรียมราคา ข่าว และผลวิเคราะห์ล่วงหน้าให้ dashboard")
+    parser.add_argument("--tickers", nargs="+", default=sorted(ALL_TICKERS), help="หุ้นที่ต้องการ (ค่าเริ่มต้น: พอร์ต + Watchlist)")
+    parser.add_argument("--interval", type=float, default=900, help="วินาทีระหว่างแต่ละรอบ")
+    parser.add_argument("--once", action="store_true", help="รันรอบเดียวแล้วจบ")
+    parser.add_argument("--skip-prices", action="store_true")
+    parser.add_argument("--skip-news", action="store_true")
+    parser.add_argument("--skip-analysis", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=8, help="จำนวนข่าวต่อหนึ่งคำขอ LLM")
+    parser.add_argument("--metrics-file", help="เขียนสถิติหลังจบแต่ละรอบ (.json เป็น JSON, อื่น ๆ เป็น Prometheus text)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    while True:
+        run_once(
+            args.tickers,
+            prices=not args.skip_prices,
+            news=not args.skip_news,
+            analyses=not args.skip_analysis,
+            batch_size=args.batch_size,
+        )
+        if args.metrics_file:
+            write_metrics(args.metrics_file)
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
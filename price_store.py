@@ -0,0 +1,127 @@
+"""คลังราคา OHLCV บนดิสก์ (Parquet รายหุ้น) ที่ดึงเพิ่มเฉพาะแท่งใหม่"""
+import contextlib
+import json
+import os
+import time
+
+import pandas as pd
+
+import telemetry
+from config import PRICE_STORE_DIR
+from fileutil import atomic_write, atomic_write_text
+from market_data import OHLCV_FIELDS, PriceBatch, YahooPriceSource
+
+try:
+    import fcntl
+except ImportError:  # Windows ไม่มี fcntl → ทำงานได้แต่ไม่ล็อกข้าม process
+    fcntl = None
+
+
+class PriceStore:
+    """เก็บราคารายวันของแต่ละหุ้นเป็นไฟล์ Parquet และจำเวลาแท่งล่าสุดไว้ใน manifest"""
+
+    def __init__(self, root=PRICE_STORE_DIR, source=None, history_period="1y"):
+        self.root = root
+        self.source = source or YahooPriceSource()
+        self.history_period = history_period
+        os.makedirs(root, exist_ok=True)
+        self._manifest_path = os.path.join(root, "manifest.json")
+
+    def _path(self, ticker):
+        return os.path.join(self.root, f"{ticker}.parquet")
+
+    @contextlib.contextmanager
+    def _lock(self):
+        with open(os.path.join(self.root, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"last_timestamp": {}, "synced_at": {}}
+
+    def _write_manifest(self, manifest):
+        atomic_write_text(self._manifest_path, json.dumps(manifest))
+
+    def last_timestamp(self, ticker):
+        value = self._read_manifest()["last_timestamp"].get(ticker)
+        return pd.Timestamp(value) if value else None
+
+    def read(self, ticker):
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=OHLCV_FIELDS, index=pd.DatetimeIndex([]), dtype=float)
+        return pd.read_parquet(path)
+
+    def append(self, ticker, bars):
+        """รวมแท่งใหม่เข้ากับของเดิม (แท่งซ้ำวันใช้ค่าใหม่ เพราะแท่งล่าสุดอาจยังไม่ปิด)"""
+        stored = self.read(ticker)
+        merged = pd.concat([stored, bars]) if len(stored) else bars
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        atomic_write(self._path(ticker), merged.to_parquet)
+        return merged
+
+    def load(self, tickers, since=None):
+        """อ่านราคาจากดิสก์เป็น DataFrame แบบกว้าง (field, ticker) เหมือน market_data"""
+        frames = {}
+        for ticker in tickers:
+            frame = self.read(ticker)
+            if since is not None:
+                frame = frame.loc[frame.index >= pd.Timestamp(since)]
+            frames[ticker] = frame
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index()
+
+    def sync(self, tickers, max_age=0):
+        """ดึงเฉพาะแท่งหลัง timestamp ล่าสุดของแต่ละหุ้น หุ้นที่ยังไม่มีในคลังจะดึงย้อนหลังตาม history_period
+
+        หุ้นที่ sync ไปแล้วไม่เกิน max_age วินาทีจะถูกข้าม คืน dict ของ ticker → แท่งที่ดึงมาใหม่
+        """
+        fetched = {}
+        with self._lock():
+            manifest = self._read_manifest()
+            now = time.time()
+
+            # จัดกลุ่มหุ้นตามวันเริ่มดึง เพื่อให้หุ้นที่อัปเดตพร้อมกันใช้คำขอเดียว
+            groups = {}
+            for ticker in sorted(set(tickers)):
+                fresh = now - manifest["synced_at"].get(ticker, 0) < max_age
+                telemetry.cache("price_store", hit=fresh)
+                if fresh:
+                    continue
+                last = manifest["last_timestamp"].get(ticker)
+                # ดึงซ้ำตั้งแต่วันของแท่งล่าสุด เพื่อแทนแท่งที่ยังไม่ปิดด้วยค่าสุดท้าย
+                start = pd.Timestamp(last).normalize().strftime("%Y-%m-%d") if last else None
+                groups.setdefault(start, []).append(ticker)
+
+            attempted = False
+            try:
+                for start, group in groups.items():
+                    if start is None:
+                        wide = self.source.download(group, period=self.history_period)
+                    else:
+                        wide = self.source.download(group, start=start)
+                    batch = PriceBatch(wide)
+                    attempted = True
+                    for ticker in group:
+                        # ได้ผลว่างก็จำเวลา sync ไว้ (เช่นชื่อหุ้นผิด) ไม่ให้ดึงย้อนหลังเต็มช่วงซ้ำทุกครั้ง
+                        manifest["synced_at"][ticker] = now
+                        bars = batch.history(ticker)
+                        if bars.empty:
+                            continue
+                        merged = self.append(ticker, bars)
+                        manifest["last_timestamp"][ticker] = merged.index.max().isoformat()
+                        fetched[ticker] = bars
+            finally:
+                if attempted:
+                    self._write_manifest(manifest)
+        return fetched
@@ -0,0 +1,127 @@
+"""ตัวจำกัดอัตราการเรียก API แบบใช้ร่วมกันทั้งเครื่อง (token bucket + โควตารายวันใน SQLite)"""
+import contextlib
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from config import RATE_LIMIT_DB_PATH
+
+# granted=True → เรียกได้ทันที; ไม่เช่นนั้น retry_after คือวินาทีที่ต้องรอ (None = โควตาวันนี้หมดแล้ว)
+Permit = namedtuple("Permit", ["granted", "retry_after"])
+
+
+class SharedRateLimiter:
+    """token bucket (rate token/วินาที, สะสมได้สูงสุด burst) รวมกับงบประมาณต่อวัน
+
+    สถานะเก็บใน SQLite และแก้ไขใน transaction แบบ BEGIN IMMEDIATE
+    ทุก session และทุก worker บนเครื่องเดียวกันจึงเห็นตัวนับชุดเดียวกัน
+    """
+
+    def __init__(self, name, rate, burst, daily_budget, path=RATE_LIMIT_DB_PATH):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.daily_budget = daily_budget
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS limiter ("
+                " name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL,"
+                " day TEXT NOT NULL, used INTEGER NOT NULL)"
+            )
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _today():
+        return datetime.datetime.now().strftime("%Y%m%d")
+
+    def _load(self, conn, now):
+        row = conn.execute("SELECT tokens, updated_at, day, used FROM limiter WHERE name = ?", (self.name,)).fetchone()
+        if row is None:
+            return float(self.burst), self._today(), 0
+        tokens, updated_at, day, used = row
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        if day != self._today():
+            day, used = self._today(), 0
+        return tokens, day, used
+
+    def _save(self, conn, tokens, now, day, used):
+        conn.execute(
+            "INSERT OR REPLACE INTO limiter (name, tokens, updated_at, day, used) VALUES (?, ?, ?, ?, ?)",
+            (self.name, tokens, now, day, used),
+        )
+
+    def try_acquire(self):
+        """ขอสิทธิ์เรียก 1 ครั้งโดยไม่รอ"""
+        now = time.time()
+        with self._transaction() as conn:
+            tokens, day, used = self._load(conn, now)
+            if used >= self.daily_budget:
+                return Permit(False, None)
+            if tokens < 1:
+                return Permit(False, (1 - tokens) / self.rate)
+            self._save(conn, tokens - 1, now, day, used + 1)
+        return Permit(True, 0.0)
+
+    def acquire(self, max_wait=0):
+        """ขอสิทธิ์เรียก ถ้า token ยังไม่พอจะรอคิวได้ไม่เกิน max_wait วินาที"""
+        deadline = time.time() + max_wait
+        while True:
+            permit = self.try_acquire()
+            if permit.granted or permit.retry_after is None:
+                return permit
+            if time.time() + permit.retry_after > deadline:
+                return permit
+            time.sleep(permit.retry_after)
+
+    def refund(self):
+        """คืนสิทธิ์ที่ได้มาแต่ไม่ได้ใช้เรียกจริง"""
+        now = time.time()
+        with self._transaction() as conn:
+            tokens, day, used = self._load(conn, now)
+            self._save(conn, min(self.burst, tokens + 1), now, day, max(0, used - 1))
+
+    def used_today(self):
+        # อ่านอย่างเดียว ไม่ต้องล็อกแบบ BEGIN IMMEDIATE (dashboard เรียกทุกครั้งที่ rerun)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            row = conn.execute("SELECT day, used FROM limiter WHERE name = ?", (self.name,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[0] != self._today():
+            return 0
+        return row[1]
+
+    def remaining_today(self):
+        return max(0, self.daily_budget - self.used_today())
+
+
+class SingleFlight:
+    """ล็อกแยกตาม key ภายใน process: คำขอซ้ำของ key เดียวกันจะรอผลของคำขอแรกแทนการเรียกซ้ำ"""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        with self._guard:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            yield
@@ -0,0 +1,176 @@
+"""แคชกลางที่ใช้ร่วมกันทุก session: มี TTL จริงและจำกัดขนาดแบบ LRU
+
+MemoryCache ใช้ร่วมกันภายใน process เดียว ส่วน SQLiteCache เก็บบนดิสก์
+จึงใช้ร่วมกันได้ทุก worker บนเครื่องเดียวกันและอยู่รอดหลัง restart
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import telemetry
+from config import CACHE_BACKEND, CACHE_DB_PATH
+
+
+class MemoryCache:
+    """แคชในหน่วยความจำ (thread-safe) ลบรายการที่หมดอายุหรือใช้น้อยที่สุดเมื่อเต็ม"""
+
+    def __init__(self, namespace="default", max_entries=1000, default_ttl=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                telemetry.cache(self.namespace, hit=False)
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._items[key]
+                telemetry.cache(self.namespace, hit=False)
+                return default
+            self._items.move_to_end(key)
+            telemetry.cache(self.namespace, hit=True)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SQLiteCache:
+    """แคชบน SQLite (ค่าเก็บเป็น JSON) ใช้ร่วมกันได้ข้าม process
+
+    จำกัดขนาดได้ทั้งจำนวนรายการ (max_entries) และขนาดข้อมูลรวม (max_bytes) โดยลบรายการที่ใช้ล่าสุดนานที่สุดก่อน
+    """
+
+    def __init__(self, path=CACHE_DB_PATH, namespace="default", max_entries=1000, default_ttl=None, max_bytes=None):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)")
+
+    def _connect(self):
+        # หนึ่ง connection ต่อ thread; WAL ให้หลาย process อ่านพร้อมกับมีคนเขียนได้
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                telemetry.cache(self.namespace, hit=False)
+                return default
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                telemetry.cache(self.namespace, hit=False)
+                return default
+            conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        telemetry.cache(self.namespace, hit=True)
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), expires_at, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (self.namespace, now),
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, self.namespace, count - self.max_entries),
+            )
+        if self.max_bytes is not None:
+            # ลบรายการเก่าสุดจนขนาดรวมไม่เกิน max_bytes (ค่าที่เก็บเป็น UTF-8 จึงนับด้วย CAST AS BLOB)
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM ("
+                "  SELECT key, SUM(LENGTH(CAST(value AS BLOB))) OVER (ORDER BY accessed_at DESC, key) AS running"
+                "  FROM cache WHERE namespace = ?)"
+                " WHERE running > ?)",
+                (self.namespace, self.namespace, self.max_bytes),
+            )
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self):
+        with self._connect() as conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()
+        return count
+
+
+def make_cache(namespace, max_entries=1000, default_ttl=None, max_bytes=None, backend=None):
+    """สร้างแคชตาม backend ที่ตั้งไว้ (INVEST_CACHE_BACKEND = "sqlite" หรือ "memory")
+
+    max_bytes ใช้ได้เฉพาะ SQLite ส่วน MemoryCache จำกัดด้วยจำนวนรายการอย่างเดียว
+    """
+    backend = backend or CACHE_BACKEND
+    if backend == "memory":
+        return MemoryCache(namespace, max_entries=max_entries, default_ttl=default_ttl)
+    if backend == "sqlite":
+        return SQLiteCache(namespace=namespace, max_entries=max_entries, default_ttl=default_ttl, max_bytes=max_bytes)
+    raise ValueError(f"ไม่รองรับ cache backend: {backend}")
@@ -0,0 +1,94 @@
+"""กฎสัญญาณซื้อ/ขายจาก RSI และ EMA ทั้งแบบรายตัว (ข้อความแนะนำ) และแบบ vectorized สำหรับทุกหุ้น"""
+import numpy as np
+import pandas as pd
+
+RSI_OVERSOLD = 30
+RSI_OVERBOUGHT = 70
+RSI_LOW = 40
+RSI_HIGH = 60
+EMA_STRONG_PCT = 2
+
+NO_DATA = "— ไม่มีข้อมูล"
+
+
+def rsi_recommendation(rsi):
+    if rsi < RSI_OVERSOLD:
+        return "🟢 RSI ต่ำเกินไป → สัญญาณซื้อแข็งแกร่ง"
+    elif rsi > RSI_OVERBOUGHT:
+        return "🔴 RSI สูงเกินไป → สัญญาณขายแข็งแกร่ง"
+    elif rsi < RSI_LOW:
+        return "🟡 RSI ค่อนข้างต่ำ → อาจพิจารณาซื้อ"
+    elif rsi > RSI_HIGH:
+        return "🟡 RSI ค่อนข้างสูง → ระวังการปรับตัวลง"
+    else:
+        return "⚪ RSI ปกติ → ถือหรือรอจังหวะ"
+
+
+def ema_recommendation(price, ema):
+    diff_percent = ((price - ema) / ema * 100)
+    if diff_percent > EMA_STRONG_PCT:
+        return f"🟢 ราคาสูงกว่า EMA {diff_percent:.1f}% → เทรนด์ขาขึ้นแข็งแกร่ง"
+    elif diff_percent < -EMA_STRONG_PCT:
+        return f"🔴 ราคาต่ำกว่า EMA {abs(diff_percent):.1f}% → เทรนด์ขาลงแข็งแกร่ง"
+    elif diff_percent > 0:
+        return f"🟡 ราคาสูงกว่า EMA {diff_percent:.1f}% → เทรนด์ขาขึ้นอ่อน"
+    elif diff_percent < 0:
+        return f"🟡 ราคาต่ำกว่า EMA {abs(diff_percent):.1f}% → เทรนด์ขาลงอ่อน"
+    else:
+        return "⚪ ราคาใกล้เคียง EMA → อาจรอแนวโน้ม"
+
+
+def rsi_signals(rsi):
+    """ป้ายสัญญาณ RSI ของทุกหุ้น (เงื่อนไขเดียวกับ rsi_recommendation)"""
+    rsi = np.asarray(rsi, dtype=float)
+    labels = np.select(
+        [np.isnan(rsi), rsi < RSI_OVERSOLD, rsi > RSI_OVERBOUGHT, rsi < RSI_LOW, rsi > RSI_HIGH],
+        [NO_DATA, "🟢 ต่ำเกินไป → ซื้อแข็งแกร่ง", "🔴 สูงเกินไป → ขายแข็งแกร่ง", "🟡 ค่อนข้างต่ำ → อาจพิจารณาซื้อ",
+         "🟡 ค่อนข้างสูง → ระวังการปรับตัวลง"],
+        default="⚪ ปกติ → ถือหรือรอจังหวะ",
+    )
+    return labels
+
+
+def ema_signals(diff_percent):
+    """ป้ายสัญญาณ EMA ของทุกหุ้นจาก % ที่ราคาห่างจาก EMA (เงื่อนไขเดียวกับ ema_recommendation)"""
+    diff_percent = np.asarray(diff_percent, dtype=float)
+    return np.select(
+        [np.isnan(diff_percent), diff_percent > EMA_STRONG_PCT, diff_percent < -EMA_STRONG_PCT, diff_percent > 0, diff_percent < 0],
+        [NO_DATA, "🟢 ขาขึ้นแข็งแกร่ง", "🔴 ขาลงแข็งแกร่ง", "🟡 ขาขึ้นอ่อน", "🟡 ขาลงอ่อน"],
+        default="⚪ ใกล้เคียง EMA",
+    )
+
+
+def buy_sell_signals(price, rsi, ema, oversold=RSI_OVERSOLD, overbought=RSI_OVERBOUGHT):
+    """กฎในสรุปภาพรวม: ซื้อเมื่อ RSI < oversold และราคา > EMA, ขายเมื่อ RSI > overbought และราคา < EMA
+
+    คืน (buy, sell) เป็น boolean array/DataFrame รูปเดียวกับ input
+    """
+    buy = (rsi < oversold) & (price > ema)
+    sell = (rsi > overbought) & (price < ema)
+    return buy, sell
+
+
+def build_screener(snapshot, portfolio=(), watchlist=()):
+    """ตาราง screener ของทุกหุ้นจากค่าล่าสุดของตัวชี้วัด (ticker × ตัวชี้วัด) ในการคำนวณรอบเดียว"""
+    price, rsi, ema = snapshot["price"], snapshot["rsi"], snapshot["ema"]
+    ema_diff = (price - ema) / ema * 100
+    buy, sell = buy_sell_signals(price, rsi, ema)
+    screener = pd.DataFrame({
+        "กลุ่ม": np.select(
+            [snapshot.index.isin(list(portfolio)), snapshot.index.isin(list(watchlist))],
+            ["📊 พอร์ต", "👁️ Watchlist"],
+            default="➕ เพิ่มเอง",
+        ),
+        "ราคา": price.round(2),
+        "% เปลี่ยนแปลง": snapshot["change"].round(2),
+        "RSI": rsi.round(1),
+        "EMA": ema.round(2),
+        "ห่าง EMA (%)": ema_diff.round(2),
+        "สัญญาณ RSI": rsi_signals(rsi),
+        "สัญญาณ EMA": ema_signals(ema_diff),
+        "คำแนะนำ": np.select([buy, sell], ["✅ ซื้อ", "❌ ขาย"], default="⏳ รอ"),
+    }, index=snapshot.index)
+    screener.index.name = "Ticker"
+    return screener
@@ -0,0 +1,221 @@
+"""ตัวเก็บสถิติเบา ๆ ภายใน process: เวลาเรียก upstream (histogram), hit/miss ของแคช, จำนวน error/fallback
+
+ส่งออกได้ทั้ง JSON และ Prometheus text format ค่าทั้งหมดเป็นของ process นี้เท่านั้น (เริ่มนับใหม่เมื่อ restart)
+"""
+import contextlib
+import json
+import math
+import threading
+import time
+
+# ขอบบนของ bucket (วินาที) ครอบคลุมตั้งแต่อ่านแคชในเครื่องจนถึงเรียก LLM
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+class Histogram:
+    """histogram แบบ bucket สะสมเหมือน Prometheus"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # ช่องสุดท้ายคือ +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """ประมาณค่า quantile จาก bucket (interpolate เชิงเส้นภายใน bucket)"""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            if count and seen + count >= rank:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else math.nan,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class Registry:
+    """เก็บ counter และ histogram แยกตามชื่อ + label (thread-safe)
+
+    gauge ลงทะเบียนเป็นฟังก์ชันที่ถูกเรียกตอนส่งออก เช่นโควตา NewsAPI ที่อ่านจาก SQLite
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    def count(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def timed(self, service, **labels):
+        """จับเวลาการเรียก upstream หนึ่งครั้ง ถ้ามี exception นับเป็น error ด้วย (แล้วส่งต่อ)"""
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            self.observe("upstream_latency_seconds", time.perf_counter() - started, service=service, **labels)
+            self.count("upstream_requests_total", service=service, outcome=outcome, **labels)
+
+    def cache(self, name, hit):
+        self.count("cache_requests_total", cache=name, result="hit" if hit else "miss")
+
+    def fallback(self, kind, reason="error"):
+        self.count("fallbacks_total", kind=kind, reason=reason)
+
+    def gauge(self, name, func, **labels):
+        """ลงทะเบียน gauge ที่คำนวณค่าตอนส่งออก (ชื่อ+label ซ้ำจะทับของเดิม)"""
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = func
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _gauge_values(self):
+        with self._lock:
+            gauges = list(self._gauges.items())
+        values = {}
+        for key, func in gauges:
+            try:
+                values[key] = float(func())
+            except Exception:
+                values[key] = math.nan
+        return values
+
+    def cache_ratios(self):
+        """hit ratio ของแต่ละแคช → {ชื่อแคช: {"hit", "miss", "ratio"}}"""
+        ratios = {}
+        with self._lock:
+            counters = list(self._counters.items())
+        for (name, labels), value in counters:
+            if name != "cache_requests_total":
+                continue
+            labels = dict(labels)
+            entry = ratios.setdefault(labels["cache"], {"hit": 0, "miss": 0})
+            entry[labels["result"]] += value
+        for entry in ratios.values():
+            total = entry["hit"] + entry["miss"]
+            entry["ratio"] = entry["hit"] / total if total else math.nan
+        return ratios
+
+    def snapshot(self):
+        """สถิติทั้งหมดในรูป dict (ใช้ทั้ง debug panel และ JSON)"""
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self._counters.items())]
+            histograms = [{"name": n, "labels": dict(l), **h.to_dict()}
+                          for (n, l), h in sorted(self._histograms.items(), key=lambda item: item[0])]
+        gauges = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self._gauge_values().items())]
+        return {
+            "generated_at": time.time(),
+            "counters": counters,
+            "histograms": histograms,
+            "gauges": gauges,
+            "cache_ratios": self.cache_ratios(),
+        }
+
+    def to_json(self, indent=None):
+        # NaN ไม่ใช่ JSON ที่ถูกต้อง → แปลงเป็น null
+        def clean(value):
+            if isinstance(value, float) and math.isnan(value):
+                return None
+            if isinstance(value, dict):
+                return {k: clean(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [clean(v) for v in value]
+            return value
+        return json.dumps(clean(self.snapshot()), ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self, prefix="invest_"):
+        """ส่งออกเป็น Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = [(key, h.to_dict(), h.buckets) for key, h in sorted(self._histograms.items(), key=lambda item: item[0])]
+
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {prefix}{name} counter")
+                declared.add(name)
+            lines.append(f"{prefix}{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), data, buckets in histograms:
+            if name not in declared:
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                declared.add(name)
+            cumulative = 0
+            for bound, count in zip([str(b) for b in buckets] + ["+Inf"], data["buckets"].values()):
+                cumulative += count
+                lines.append(f"{prefix}{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {data['sum']}")
+            lines.append(f"{prefix}{name}_count{_format_labels(labels)} {data['count']}")
+
+        for (name, labels), value in sorted(self._gauge_values().items()):
+            if name not in declared:
+                lines.append(f"# TYPE {prefix}{name} gauge")
+                declared.add(name)
+            lines.append(f"{prefix}{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# ตัวเก็บสถิติกลางของ process (ใช้ร่วมกันทุก session)
+REGISTRY = Registry()
+
+count = REGISTRY.count
+observe = REGISTRY.observe
+timed = REGISTRY.timed
+cache = REGISTRY.cache
+fallback = REGISTRY.fallback
+gauge = REGISTRY.gauge
+snapshot = REGISTRY.snapshot
+to_json = REGISTRY.to_json
+to_prometheus = REGISTRY.to_prometheus
@@ -0,0 +1,84 @@
+"""ทดสอบว่า StreamingIndicators ให้ค่าเดียวกับสูตร batch ใน indicators.py"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from market_data import LocalPriceSource
+
+
+@pytest.fixture(scope="module")
+def closes():
+    # random walk ที่ซ้ำได้ทุกครั้ง (วันสิ้นสุดคงที่ ไม่ขึ้นกับวันที่รันเทส)
+    data = LocalPriceSource(end="2024-06-28").download(["NVDA"], period="1y")
+    return data["Close"]["NVDA"]
+
+
+def stream(closes, **kwargs):
+    """เลื่อนสถานะทีละแท่ง แล้วคืน (rsi, ema) ของทุกแท่งเป็น Series"""
+    state = indicators.StreamingIndicators(**kwargs)
+    rsi, ema = [], []
+    for timestamp, close in closes.items():
+        state.update(close, timestamp)
+        rsi.append(state.rsi)
+        ema.append(state.ema)
+    return pd.Series(rsi, index=closes.index), pd.Series(ema, index=closes.index)
+
+
+@pytest.mark.parametrize("method", ["sma", "wilder"])
+def test_streaming_matches_batch(closes, method):
+    rsi, ema = stream(closes, rsi_method=method)
+    np.testing.assert_allclose(rsi, indicators.rsi(closes, method=method), rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(ema, indicators.ema(closes), rtol=1e-9)
+
+
+@pytest.mark.parametrize("method", ["sma", "wilder"])
+def test_leading_nan_bars_are_skipped(closes, method):
+    closes = closes.copy()
+    closes.iloc[:5] = np.nan
+    rsi, ema = stream(closes, rsi_method=method)
+    assert rsi.iloc[:5].isna().all()
+    np.testing.assert_allclose(rsi, indicators.rsi(closes, method=method), rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(ema.iloc[5:], indicators.ema(closes).iloc[5:], rtol=1e-9)
+
+
+@pytest.mark.parametrize("method", ["sma", "wilder"])
+def test_round_trip_then_advance(closes, method):
+    head, tail = closes.iloc[:100], closes.iloc[100:]
+    state = indicators.StreamingIndicators.from_history(head, rsi_method=method)
+    restored = indicators.StreamingIndicators.from_dict(json.loads(json.dumps(state.to_dict())))
+    assert restored.values() == state.values()
+
+    # advance ข้ามแท่งที่ไม่ใหม่กว่า as_of ส่งทั้ง Series ซ้ำได้
+    restored.advance(closes)
+    expected = indicators.StreamingIndicators.from_history(closes, rsi_method=method)
+    assert restored.count == expected.count == len(head) + len(tail)
+    assert restored.rsi == pytest.approx(indicators.rsi(closes, method=method).iloc[-1], rel=1e-9)
+    assert restored.ema == pytest.approx(indicators.ema(closes).iloc[-1], rel=1e-9)
+
+
+def test_mixed_calendars_match_single_ticker():
+    # หุ้นวันทำการ + คริปโตที่มีแท่งทุกวัน (รวมเสาร์-อาทิตย์) ในเมทริกซ์เดียว วันสิ้นสุดเป็นวันจันทร์
+    source = LocalPriceSource(end="2024-07-01")
+    stock = source.download(["NVDA"], period="1y")
+    days = pd.date_range("2023-07-01", "2024-07-01")
+    crypto = source._synthetic("BTC-USD").reindex(days).ffill().bfill()
+    frames = {"NVDA": stock.xs("NVDA", axis=1, level=1), "BTC-USD": crypto}
+    wide = pd.concat(frames, axis=1, sort=True).swaplevel(axis=1)
+
+    combined = indicators.compute_indicators(wide["Close"], high=wide["High"], low=wide["Low"])
+    for ticker, frame in frames.items():
+        single = indicators.compute_indicators(frame[["Close"]].set_axis([ticker], axis=1),
+                                               high=frame[["High"]].set_axis([ticker], axis=1),
+                                               low=frame[["Low"]].set_axis([ticker], axis=1))
+        for name, values in single.items():
+            np.testing.assert_allclose(combined[name][ticker].reindex(frame.index), values[ticker],
+                                       rtol=1e-9, err_msg=f"{ticker} {name}")
+        # วันที่หุ้นนี้ไม่มีแท่งต้องเป็น NaN ไม่ใช่ค่าที่คำนวณต่อจากแท่งว่าง
+        missing = combined["rsi"][ticker].index.difference(frame.index)
+        assert combined["rsi"][ticker].loc[missing].isna().all()
+
+    latest = indicators.latest(combined)
+    assert not np.isnan(latest.loc["NVDA", "change"])
@@ -0,0 +1,85 @@
+"""ทะเบียนข้อมูลหุ้นชุดเดียว (ชื่อ, sector, คำค้นข่าว, ป้ายแสดงผล, พอร์ต/Watchlist) โหลดจากไฟล์ JSON
+
+ทุกค่าคำนวณครั้งเดียวตอนโหลด การค้นหาระหว่างโหลดหน้าจึงเป็นการอ่าน dict/set อย่างเดียว
+"""
+import json
+from collections import namedtuple
+
+TickerInfo = namedtuple("TickerInfo", ["symbol", "name", "sector", "query", "sector_context", "sector_trend", "label"])
+
+PORTFOLIO_ICON = "📊 "
+WATCHLIST_ICON = "👁️ "
+
+
+class TickerRegistry:
+    """ข้อมูลของทุกหุ้นที่รู้จัก หุ้นที่ไม่อยู่ในไฟล์ (เช่นที่ผู้ใช้เพิ่มเอง) ได้ค่าเริ่มต้นจากชื่อหุ้น"""
+
+    def __init__(self, portfolio=(), watchlist=(), companies=None, sector_buckets=(), default_bucket=None):
+        self.portfolio = tuple(portfolio)
+        self.watchlist = tuple(watchlist)
+        self.portfolio_set = frozenset(self.portfolio)
+        self.watchlist_set = frozenset(self.watchlist)
+        # พอร์ตก่อนแล้วตามด้วย Watchlist (ไม่ซ้ำ, ลำดับคงที่)
+        self.all_tickers = tuple(dict.fromkeys(self.portfolio + self.watchlist))
+        self.sector_buckets = [(tuple(b["keywords"]), b["context"], b["trend"]) for b in sector_buckets]
+        default_bucket = default_bucket or {"context": "ตลาดหุ้นโดยรวม", "trend": "แนวโน้มเศรษฐกิจโลก"}
+        self.default_bucket = (default_bucket["context"], default_bucket["trend"])
+
+        companies = companies or {}
+        self._info = {}
+        for symbol in set(companies) | set(self.all_tickers):
+            self._info[symbol] = self._build(symbol, companies.get(symbol, {}))
+
+    def _bucket(self, sector):
+        """จัด sector เข้ากลุ่มตามคำสำคัญ (กลุ่มแรกที่ตรงชนะ)"""
+        for keywords, context, trend in self.sector_buckets:
+            if any(keyword in sector for keyword in keywords):
+                return context, trend
+        return self.default_bucket
+
+    def _build(self, symbol, company):
+        name = company.get("name", symbol)
+        sector = company.get("sector", "General")
+        context, trend = self._bucket(sector)
+        icon = PORTFOLIO_ICON if symbol in self.portfolio_set else WATCHLIST_ICON
+        return TickerInfo(
+            symbol=symbol,
+            name=name,
+            sector=sector,
+            query=company.get("query", symbol),
+            sector_context=context,
+            sector_trend=trend,
+            label=f"{icon}{symbol} - {name}",
+        )
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            portfolio=data.get("portfolio", ()),
+            watchlist=data.get("watchlist", ()),
+            companies=data.get("companies"),
+            sector_buckets=data.get("sector_buckets", ()),
+            default_bucket=data.get("default_bucket"),
+        )
+
+    def get(self, symbol):
+        info = self._info.get(symbol)
+        if info is None:
+            info = self._build(symbol, {})
+        return info
+
+    def query(self, symbol):
+        """คำค้นข่าวของหุ้น (ไม่มีในไฟล์ → ใช้ชื่อหุ้น)"""
+        return self.get(symbol).query
+
+    def label(self, symbol):
+        """ข้อความใน selectbox เช่น "📊 NVDA - Nvidia" """
+        return self.get(symbol).label
+
+    def __contains__(self, symbol):
+        return symbol in self._info
+
+    def __len__(self):
+        return len(self._info)